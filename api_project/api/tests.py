@@ -1,3 +1,48 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication, token_cache
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create_user(username='reader', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_repeat_lookups_are_served_from_the_cache(self):
+        with self.assertNumQueries(1):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            cached_user, cached_token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual((cached_user, cached_token), (user, token))
+        # Copies, so one request's changes never leak into the next.
+        self.assertIsNot(cached_user, user)
+
+    def test_deleted_token_is_evicted(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(TOKEN_CACHE_TTL=60)
+    def test_entries_expire_after_the_ttl(self):
+        self.auth.authenticate_credentials(self.token.key)
+        later = time.monotonic() + 61
+        with mock.patch('api.authentication.time.monotonic', return_value=later), self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(TOKEN_CACHE_MAX_SIZE=1)
+    def test_least_recently_used_token_is_dropped(self):
+        other = Token.objects.create(user=User.objects.create_user(username='writer', password='pass12345'))
+        self.auth.authenticate_credentials(self.token.key)
+        self.auth.authenticate_credentials(other.key)
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
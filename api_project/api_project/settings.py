@@ -126,11 +126,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        # Use TokenAuthentication as the primary method
-        'rest_framework.authentication.TokenAuthentication', 
+        # TokenAuthentication with an in-process cache of recently used tokens
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         # Set a restrictive default for safety
         'rest_framework.permissions.IsAuthenticatedOrReadOnly' 
     ]
-}
\ No newline at end of file
+}
+
+# Token cache lifetime in seconds, and its size per process.
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_MAX_SIZE = 10000
@@ -0,0 +1,100 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication
+
+
+class TokenCache:
+    """
+    Thread-safe LRU of token key -> (user, token) with a per-entry TTL.
+
+    Entries are evicted on token delete and user save (see accounts.signals);
+    the TTL bounds staleness in other processes, which never see those signals.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, user, token):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + settings.TOKEN_CACHE_TTL, (user, token))
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > settings.TOKEN_CACHE_MAX_SIZE:
+                self._remove(next(iter(self._entries)))
+
+    def evict(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def evict_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            user_id = entry[1][0].pk
+            keys = self._keys_by_user.get(user_id)
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that skips the Token + user query for recently seen keys.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token)
+            cached = (user, token)
+        # Each request gets its own instances; views may set attributes on them.
+        return copy.copy(cached[0]), copy.copy(cached[1])
+
+
+class BatchSubRequestAuthentication(BaseAuthentication):
+    """
+    Authenticates a batch sub-request as the batch request's user, from the
+    `batch_credentials` that social_media_api.batch.BatchView sets on it.
+    Listed first in DEFAULT_AUTHENTICATION_CLASSES; other requests fall
+    through to the classes after it.
+    """
+
+    def authenticate(self, request):
+        return getattr(request, 'batch_credentials', None)
+
+    def authenticate_header(self, request):
+        # DRF takes the 401 challenge from the first class.
+        return CachedTokenAuthentication().authenticate_header(request)
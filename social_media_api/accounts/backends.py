@@ -0,0 +1,36 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+
+from .hashers import hasher_pool, verify_and_upgrade
+
+
+class HasherPoolModelBackend(ModelBackend):
+    """
+    ModelBackend whose async path runs the password hash on hasher_pool, so
+    async logins (see LoginView) don't block the event loop while hashing.
+    Hashes at an outdated cost are re-encoded and saved.
+    """
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords.
+            await loop.run_in_executor(hasher_pool, make_password, password)
+            return None
+        is_correct, upgraded = await loop.run_in_executor(hasher_pool, verify_and_upgrade, password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if upgraded:
+            user.password = upgraded
+            await UserModel._default_manager.filter(pk=user.pk).aupdate(password=upgraded)
+        return user
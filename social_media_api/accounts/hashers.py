@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from PASSWORD_HASH_ITERATIONS.
+
+    It keeps the stock `pbkdf2_sha256` algorithm name, so existing hashes
+    verify unchanged and are re-encoded at the new cost on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+
+# Hashing is CPU bound and hashlib releases the GIL, so a small dedicated pool
+# runs logins in parallel without tying up request threads or the event loop.
+hasher_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASHER_THREADS, thread_name_prefix='password-hasher')
+
+
+def verify_and_upgrade(password, encoded):
+    """
+    Check `password` against `encoded` without touching the database.
+
+    Returns (is_correct, new_encoded); new_encoded is set when the stored
+    hash uses an outdated hasher or cost and should be saved.
+    """
+    upgraded = []
+    is_correct = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return is_correct, (upgraded[0] if upgraded else None)
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.profile_pictures import needs_renditions, render_avatar
+
+
+class Command(BaseCommand):
+    help = 'Build avatar renditions for users whose profile picture has none or outdated ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--force', action='store_true', help='Rebuild renditions for every user with a picture.')
+
+    def handle(self, *args, **options):
+        users = (
+            get_user_model().objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .only('profile_picture', 'profile_picture_renditions')
+            .order_by('pk')
+        )
+        rendered = failed = 0
+        for user in users.iterator(chunk_size=options['batch_size']):
+            if not options['force'] and not needs_renditions(user):
+                continue
+            try:
+                render_avatar(user.pk)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'User {user.pk}: {exc}')
+            else:
+                rendered += 1
+        self.stdout.write(f'Rendered avatars for {rendered} users, {failed} failed.')
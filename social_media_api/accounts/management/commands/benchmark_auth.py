@@ -0,0 +1,53 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from accounts.authentication import CachedTokenAuthentication, token_cache
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request queries and throughput of TokenAuthentication and CachedTokenAuthentication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(username='bench-auth', password='bench-auth')
+            token = Token.objects.create(user=user)
+            token_cache.clear()
+            for authentication_class in (TokenAuthentication, CachedTokenAuthentication):
+                queries, rate = self.run(authentication_class, token.key, count)
+                self.stdout.write(
+                    f'{authentication_class.__name__:28} {queries / count:5.2f} queries/request  {rate:10.1f} requests/sec'
+                )
+            transaction.set_rollback(True)
+        token_cache.clear()
+
+    def run(self, authentication_class, key, count):
+        class WhoAmI(APIView):
+            authentication_classes = [authentication_class]
+            permission_classes = [IsAuthenticated]
+
+            def get(self, request):
+                return Response({'id': request.user.pk})
+
+        view = WhoAmI.as_view()
+        factory = APIRequestFactory()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            for _ in range(count):
+                response = view(factory.get('/whoami/', HTTP_AUTHORIZATION=f'Token {key}'))
+                assert response.status_code == 200, response.data
+            elapsed = time.perf_counter() - started
+        return len(context.captured_queries), count / elapsed
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import aauthenticate, authenticate, get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = 'Compare login throughput of blocking authenticate() and the pooled async login path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=64)
+        parser.add_argument('--concurrency', type=int, default=16)
+
+    def handle(self, *args, **options):
+        count = options['logins']
+        self.stdout.write(
+            f'{settings.PASSWORD_HASH_ITERATIONS} iterations, {settings.PASSWORD_HASHER_THREADS} hasher threads'
+        )
+        with transaction.atomic():
+            get_user_model().objects.create_user(username='bench-login', password='bench-login')
+
+            started = time.perf_counter()
+            for _ in range(count):
+                assert authenticate(username='bench-login', password='bench-login') is not None
+            self.report('authenticate()', count, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            async_to_sync(self.login_concurrently)(count, options['concurrency'])
+            self.report('aauthenticate()', count, time.perf_counter() - started)
+            transaction.set_rollback(True)
+
+    async def login_concurrently(self, count, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login():
+            async with semaphore:
+                assert await aauthenticate(username='bench-login', password='bench-login') is not None
+
+        await asyncio.gather(*(login() for _ in range(count)))
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(f'{label:16} {count / elapsed:8.1f} logins/sec')
@@ -0,0 +1,32 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.profile_pictures import process_profile_picture, spooled_user_id
+
+
+class Command(BaseCommand):
+    help = 'Process profile pictures left in PROFILE_PICTURE_SPOOL_DIR, e.g. after a failed job or restart.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=float, default=300,
+            help='Only pick up files spooled at least this many seconds ago, leaving in-flight jobs alone.',
+        )
+
+    def handle(self, *args, **options):
+        spool_dir = Path(settings.PROFILE_PICTURE_SPOOL_DIR)
+        cutoff = time.time() - options['older_than']
+        paths = sorted(path for path in spool_dir.glob('*') if path.is_file() and path.stat().st_mtime <= cutoff)
+        processed = failed = 0
+        for path in paths:
+            try:
+                process_profile_picture(spooled_user_id(path), path)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'{path.name}: {exc}')
+            else:
+                processed += 1
+        self.stdout.write(f'Processed {processed} profile pictures, {failed} failed.')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from accounts.models import CustomUser, Follow
+
+
+def count_subquery(field):
+    counts = (
+        Follow.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute CustomUser.follower_count and following_count from the Follow table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = CustomUser.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write('No users to reconcile.')
+            return
+
+        updated = 0
+        # One UPDATE per primary key range keeps each statement's lock short.
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            updated += CustomUser.objects.filter(pk__gte=start, pk__lt=start + batch_size).update(
+                follower_count=count_subquery('followee'),
+                following_count=count_subquery('follower'),
+            )
+        self.stdout.write(self.style.SUCCESS(f'Reconciled follow counters on {updated} users.'))
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_follow_edges(apps, schema_editor):
+    """
+    Merge the old `following` and `followers` join tables into Follow.
+    A row in `followers` for user X pointing at Y means Y follows X.
+
+    The copy is one INSERT ... SELECT, so edges never pass through Python.
+    """
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Follow = apps.get_model('accounts', 'Follow')
+    quote = schema_editor.quote_name
+    following = quote(CustomUser.following.through._meta.db_table)
+    followers = quote(CustomUser.followers.through._meta.db_table)
+    source, target = quote('from_customuser_id'), quote('to_customuser_id')
+    # One timestamp for both halves, so UNION drops edges present in both tables.
+    now = schema_editor.connection.ops.adapt_datetimefield_value(timezone.now())
+    columns = ', '.join(quote(column) for column in ('follower_id', 'followee_id', 'created_at'))
+    schema_editor.execute(
+        f'INSERT INTO {quote(Follow._meta.db_table)} ({columns}) '
+        f'SELECT {source}, {target}, %s FROM {following} WHERE {source} <> {target} '
+        f'UNION '
+        f'SELECT {target}, {source}, %s FROM {followers} WHERE {source} <> {target}',
+        [now, now],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('followee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_edges', to=settings.AUTH_USER_MODEL)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_edges', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['followee', 'follower'], name='accounts_fo_followe_7158b0_idx')],
+                'constraints': [models.UniqueConstraint(fields=('follower', 'followee'), name='unique_follow')],
+            },
+        ),
+        migrations.RunPython(copy_follow_edges, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='followers',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='following',
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following',
+            field=models.ManyToManyField(blank=True, related_name='followers', through='accounts.Follow', through_fields=('follower', 'followee'), to=settings.AUTH_USER_MODEL),
+        ),
+    ]
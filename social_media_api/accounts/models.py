@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
@@ -7,8 +8,21 @@ from django.contrib.auth.models import AbstractUser
 class CustomUser(AbstractUser):
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
-    followers = models.ManyToManyField('self', symmetrical=False, related_name='followed_by', blank=True)
-    following = models.ManyToManyField('self', symmetrical=False, related_name='followers_set', blank=True)
+    # Rendition name -> storage path, filled in by accounts.profile_pictures.
+    profile_picture_renditions = models.JSONField(default=dict, blank=True)
+    # Single edge table: user.following are the users they follow,
+    # user.followers the users following them.
+    following = models.ManyToManyField(
+        'self',
+        through='Follow',
+        through_fields=('follower', 'followee'),
+        symmetrical=False,
+        related_name='followers',
+        blank=True,
+    )
+    # Denormalized edge counts, updated with F() alongside Follow writes.
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
     groups = models.ManyToManyField(
         'auth.Group',
         related_name='customuser_set',
@@ -24,3 +38,20 @@ class CustomUser(AbstractUser):
         verbose_name='user permissions'
     )
 
+
+class Follow(models.Model):
+    follower = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='following_edges')
+    followee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='follower_edges')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followee'], name='unique_follow'),
+        ]
+        indexes = [
+            models.Index(fields=['followee', '-created_at', '-id']),
+            models.Index(fields=['follower', '-created_at', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.follower.username} follows {self.followee.username}"
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from PIL import Image, ImageOps
+
+from .authentication import token_cache
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+
+def spool_upload(upload, user_id):
+    """
+    Write an uploaded picture to PROFILE_PICTURE_SPOOL_DIR and return its path.
+    The file name starts with the user id so leftovers can be reprocessed.
+    """
+    spool_dir = Path(settings.PROFILE_PICTURE_SPOOL_DIR)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    path = spool_dir / f'{user_id}-{uuid.uuid4().hex}{Path(upload.name).suffix.lower()}'
+    with open(path, 'wb') as spooled:
+        for chunk in upload.chunks():
+            spooled.write(chunk)
+    return path
+
+
+def spooled_user_id(path):
+    return int(Path(path).name.split('-', 1)[0])
+
+
+def picture_storage():
+    return get_user_model()._meta.get_field('profile_picture').storage
+
+
+def load_image(file):
+    with Image.open(file) as source:
+        return ImageOps.exif_transpose(source).convert('RGB')
+
+
+def encode(image, image_format):
+    buffer = BytesIO()
+    image.save(buffer, format=image_format.upper(), quality=settings.PROFILE_PICTURE_QUALITY)
+    return buffer.getvalue()
+
+
+def save_hashed(storage, stem, content, image_format):
+    """
+    Save under a name containing the content hash, so a URL always serves the
+    same bytes and can be cached forever. Identical content is stored once.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    name = f'{stem}.{digest}.{EXTENSIONS[image_format]}'
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(content))
+
+
+def build_renditions(storage, user_id, image, source):
+    """
+    Square crops at PROFILE_PICTURE_RENDITIONS sizes in each of
+    PROFILE_PICTURE_FORMATS, as {'source': ..., name: {format: path}}.
+    """
+    renditions = {'source': source}
+    for name, size in settings.PROFILE_PICTURE_RENDITIONS.items():
+        square = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        renditions[name] = {
+            image_format: save_hashed(storage, f'profile_pics/{user_id}/{name}', encode(square, image_format), image_format)
+            for image_format in settings.PROFILE_PICTURE_FORMATS
+        }
+    return renditions
+
+
+def rendition_paths(renditions):
+    return {path for name, formats in renditions.items() if name != 'source' for path in formats.values()}
+
+
+def store_avatar(user_id, picture, renditions, current=None):
+    """
+    Point the user at a new picture and renditions, then delete the files they
+    replace. `current` restricts the update to users still on that picture.
+    Returns False, after cleaning up the new files, if no row was updated.
+    """
+    User = get_user_model()
+    storage = picture_storage()
+    users = User.objects.filter(pk=user_id)
+    if current is not None:
+        users = users.filter(profile_picture=current)
+    previous = users.values_list('profile_picture', 'profile_picture_renditions').first()
+    new_files = {picture, *rendition_paths(renditions)}
+    if previous is None or not users.update(profile_picture=picture, profile_picture_renditions=renditions):
+        for name in new_files - {current}:
+            storage.delete(name)
+        return False
+    old_picture, old_renditions = previous
+    for name in ({old_picture, *rendition_paths(old_renditions)} - new_files - {''}):
+        storage.delete(name)
+    token_cache.evict_user(user_id)
+    return True
+
+
+def process_profile_picture(user_id, spool_path):
+    """
+    Resize a spooled upload, store it and its renditions, then drop the spool file.
+    """
+    storage = picture_storage()
+    spool_path = Path(spool_path)
+    image = load_image(spool_path)
+    original = image.copy()
+    original.thumbnail((settings.PROFILE_PICTURE_MAX_SIZE, settings.PROFILE_PICTURE_MAX_SIZE))
+    picture = save_hashed(storage, f'profile_pics/{user_id}/original', encode(original, 'jpeg'), 'jpeg')
+    store_avatar(user_id, picture, build_renditions(storage, user_id, image, picture))
+    spool_path.unlink()
+
+
+def render_avatar(user_id):
+    """
+    Build renditions for a picture that is already in storage, e.g. one set
+    through the admin or uploaded before renditions existed.
+    """
+    user = get_user_model().objects.only('profile_picture').get(pk=user_id)
+    picture = user.profile_picture.name
+    if not picture:
+        return False
+    with user.profile_picture.open('rb') as file:
+        image = load_image(file)
+    return store_avatar(user_id, picture, build_renditions(picture_storage(), user_id, image, picture), current=picture)
+
+
+def needs_renditions(user):
+    return bool(user.profile_picture) and user.profile_picture_renditions.get('source') != user.profile_picture.name
+
+
+class ProfilePictureQueue:
+    """
+    Background processing of profile pictures.
+
+    Jobs run on PROFILE_PICTURE_WORKERS threads, or inline when
+    PROFILE_PICTURE_PROCESS_SYNC is set. A failed upload job leaves its spool
+    file in place for the process_profile_pictures command to retry.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.PROFILE_PICTURE_WORKERS, thread_name_prefix='profile-picture',
+        )
+
+    def submit(self, job, *args):
+        if settings.PROFILE_PICTURE_PROCESS_SYNC:
+            job(*args)
+            return None
+        return self._executor.submit(self._run, job, *args)
+
+    def _run(self, job, *args):
+        try:
+            job(*args)
+        except Exception:
+            logger.exception('Profile picture job %s%r failed', job.__name__, args)
+        finally:
+            connection.close()
+
+
+profile_picture_queue = ProfilePictureQueue()
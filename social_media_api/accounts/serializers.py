@@ -1,7 +1,29 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
 from .models import CustomUser
+from .profile_pictures import picture_storage, process_profile_picture, profile_picture_queue, spool_upload
+
+class AvatarField(serializers.Field):
+    """
+    Rendition URLs as {size: {format: url}}. File names carry a content hash,
+    so each URL is immutable; MediaStorage stores them with Cache-Control to match.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'profile_picture_renditions')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, renditions):
+        storage = picture_storage()
+        return {
+            name: {image_format: storage.url(path) for image_format, path in formats.items()}
+            for name, formats in renditions.items()
+            if name != 'source'
+        }
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -17,18 +39,41 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             email=validated_data.get('email', ''),
             password=validated_data['password'],
             bio=validated_data.get('bio', ''),
-            profile_picture=validated_data.get('profile_picture', None)
         )
+        # The picture is spooled locally; resizing and the storage upload happen
+        # in the background once the account is committed.
+        upload = validated_data.get('profile_picture')
+        if upload is not None:
+            spool_path = spool_upload(upload, user.pk)
+            transaction.on_commit(lambda: profile_picture_queue.submit(process_profile_picture, user.pk, spool_path))
         token = Token.objects.create(user=user)
         user.token = token.key  # Attach token to serializer output
         return user
 
 class UserLoginSerializer(serializers.Serializer):
+    # Credentials are checked by LoginView so hashing can run off the event loop.
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
-    def validate(self, data):
-        user = authenticate(username=data['username'], password=data['password'])
-        if user and user.is_active:
-            return user
-        raise serializers.ValidationError("Invalid credentials")
\ No newline at end of file
+class UserProfileSerializer(serializers.ModelSerializer):
+    avatar = AvatarField()
+
+    class Meta:
+        model = CustomUser
+        fields = ('id', 'username', 'bio', 'profile_picture', 'avatar', 'follower_count', 'following_count')
+        read_only_fields = fields
+
+class FollowListSerializer(serializers.Serializer):
+    # Rows are Follow.values() dicts, not user instances.
+    id = serializers.IntegerField(source='user_id')
+    username = serializers.CharField()
+    avatar = AvatarField()
+    followed_at = serializers.DateTimeField(source='created_at')
+
+class BulkFollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_user_ids(self, value):
+        if len(value) > settings.FOLLOW_BULK_MAX_IDS:
+            raise serializers.ValidationError(f'At most {settings.FOLLOW_BULK_MAX_IDS} ids per request.')
+        return list(dict.fromkeys(value))
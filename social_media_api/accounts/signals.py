@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .profile_pictures import needs_renditions, profile_picture_queue, render_avatar
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def evict_token(sender, instance, **kwargs):
+    token_cache.evict(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_user_tokens(sender, instance, **kwargs):
+    # Covers deactivation and any profile change the cached user would miss.
+    token_cache.evict_user(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def queue_avatar_renditions(sender, instance, **kwargs):
+    # Pictures set outside registration (admin, shell) get renditions too.
+    if needs_renditions(instance):
+        transaction.on_commit(lambda: profile_picture_queue.submit(render_avatar, instance.pk))
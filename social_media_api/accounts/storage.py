@@ -0,0 +1,21 @@
+import re
+
+from storages.backends.s3 import S3Storage
+
+# Names written by accounts.profile_pictures.save_hashed: profile_pics/<user>/<stem>.<hash>.<ext>
+HASHED_NAME = re.compile(r'^profile_pics/\d+/[\w-]+\.[0-9a-f]{16}\.\w+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class MediaStorage(S3Storage):
+    """
+    S3 media storage that marks content-hashed profile pictures and renditions
+    as immutable, so browsers and CDNs cache them without revalidating.
+    """
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        if HASHED_NAME.match(name):
+            params.setdefault('CacheControl', IMMUTABLE_CACHE_CONTROL)
+        return params
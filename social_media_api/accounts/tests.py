@@ -1,3 +1,379 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from PIL import Image
+
+from social_media_api.testing import QueryBudgetMixin
+from social_media_api.throttling import SlidingWindow
+from .authentication import token_cache
+from .models import CustomUser, Follow
+from .profile_pictures import rendition_paths
+from .storage import IMMUTABLE_CACHE_CONTROL, MediaStorage
+
+
+class FollowTests(APITestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username='alice', password='pass12345')
+        self.bob = CustomUser.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.alice)
+
+    def test_follow_writes_a_single_edge(self):
+        for _ in range(2):
+            response = self.client.post(reverse('follow-user', kwargs={'user_id': self.bob.pk}))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(list(self.alice.following.all()), [self.bob])
+        self.assertEqual(list(self.bob.followers.all()), [self.alice])
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.bob.follower_count), (1, 1))
+
+    def test_unfollow_removes_the_edge(self):
+        self.client.post(reverse('follow-user', kwargs={'user_id': self.bob.pk}))
+        self.client.post(reverse('unfollow-user', kwargs={'user_id': self.bob.pk}))
+        self.client.post(reverse('unfollow-user', kwargs={'user_id': self.bob.pk}))
+        self.assertFalse(Follow.objects.exists())
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.follower_count, 0)
+
+    def test_cannot_follow_yourself(self):
+        response = self.client.post(reverse('follow-user', kwargs={'user_id': self.alice.pk}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Follow.objects.exists())
+
+
+class FollowListTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.star = CustomUser.objects.create_user(username='star', password='pass12345')
+        self.fans = [CustomUser.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(5)]
+        for fan in self.fans:
+            self.client.force_authenticate(fan)
+            self.client.post(reverse('follow-user', kwargs={'user_id': self.star.pk}))
+
+    def test_profile_reports_counters(self):
+        response = self.client.get(reverse('user-profile', kwargs={'pk': self.star.pk}))
+        self.assertEqual(response.data['follower_count'], 5)
+        self.assertEqual(response.data['following_count'], 0)
+
+    def test_followers_are_cursor_paginated(self):
+        usernames = []
+        url = reverse('user-followers', kwargs={'pk': self.star.pk}) + '?page_size=2'
+        while url:
+            with self.assertQueryBudget(2):
+                response = self.client.get(url)
+            usernames += [row['username'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(usernames, [fan.username for fan in reversed(self.fans)])
+
+    def test_following_list(self):
+        response = self.client.get(reverse('user-following', kwargs={'pk': self.fans[0].pk}))
+        self.assertEqual([row['id'] for row in response.data['results']], [self.star.pk])
+
+    def test_unknown_user(self):
+        response = self.client.get(reverse('user-followers', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkFollowTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='newbie', password='pass12345')
+        self.others = [CustomUser.objects.create_user(username=f'user{i}', password='pass12345') for i in range(50)]
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_follow_reports_per_id_results(self):
+        Follow.objects.create(follower=self.user, followee=self.others[0])
+        ids = [other.pk for other in self.others] + [self.user.pk, 999999, self.others[1].pk]
+        with self.assertQueryBudget(10):
+            response = self.client.post(reverse('bulk-follow'), {'user_ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        statuses = {row['id']: row['status'] for row in response.data['results']}
+        self.assertEqual(len(response.data['results']), 52)
+        self.assertEqual(statuses[self.others[0].pk], 'already_following')
+        self.assertEqual(statuses[self.others[1].pk], 'followed')
+        self.assertEqual(statuses[self.user.pk], 'self')
+        self.assertEqual(statuses[999999], 'not_found')
+        self.assertEqual(Follow.objects.filter(follower=self.user).count(), 50)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 49)
+        self.assertEqual(CustomUser.objects.get(pk=self.others[1].pk).follower_count, 1)
+
+    def test_bulk_unfollow(self):
+        ids = [other.pk for other in self.others[:3]]
+        self.client.post(reverse('bulk-follow'), {'user_ids': ids}, format='json')
+        response = self.client.post(reverse('bulk-unfollow'), {'user_ids': ids[:2] + [999999]}, format='json')
+        self.assertEqual(
+            [row['status'] for row in response.data['results']], ['unfollowed', 'unfollowed', 'not_following'],
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 1)
+
+    def test_reconcile_repairs_drift(self):
+        Follow.objects.create(follower=self.user, followee=self.others[0])
+        CustomUser.objects.filter(pk=self.others[1].pk).update(follower_count=5)
+        call_command('reconcile_follow_counters', batch_size=7, stdout=StringIO())
+        counts = dict(CustomUser.objects.values_list('pk', 'follower_count'))
+        self.assertEqual((counts[self.others[0].pk], counts[self.others[1].pk]), (1, 0))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 1)
+
+    @override_settings(FOLLOW_BULK_MAX_IDS=10)
+    def test_rejects_oversized_batches(self):
+        ids = [other.pk for other in self.others[:11]]
+        response = self.client.post(reverse('bulk-follow'), {'user_ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = CustomUser.objects.create_user(username='alice', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+        self.url = reverse('bulk-unfollow')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def request(self):
+        return self.client.post(self.url, {'user_ids': [999999]}, format='json')
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.request().status_code, status.HTTP_200_OK)
+        # Only the view's own Follow lookup remains.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.request().status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        self.request()
+        self.token.delete()
+        self.assertEqual(self.request().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.request()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.request().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_CACHE_MAX_SIZE=1)
+    def test_cache_is_bounded(self):
+        other = Token.objects.create(user=CustomUser.objects.create_user(username='bob', password='pass12345'))
+        self.request()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other.key}')
+        self.request()
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertIsNotNone(token_cache.get(other.key))
+
+
+@override_settings(
+    PASSWORD_HASHERS=['accounts.hashers.ConfigurablePBKDF2PasswordHasher'],
+    PASSWORD_HASH_ITERATIONS=1000,
+)
+class LoginTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='alice', password='pass1234')
+        self.url = reverse('login')
+
+    def test_login_returns_token(self):
+        response = self.client.post(self.url, {'username': 'alice', 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['token'], Token.objects.get(user=self.user).key)
+
+    def test_login_accepts_form_data(self):
+        response = self.client.post(self.url, {'username': 'alice', 'password': 'pass1234'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_credentials(self):
+        failures = []
+        receiver = lambda sender, credentials, **kwargs: failures.append(credentials['username'])
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        for username, password in (('alice', 'wrong'), ('nobody', 'pass1234')):
+            response = self.client.post(self.url, {'username': username, 'password': password}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(failures, ['alice', 'nobody'])
+
+    def test_inactive_user_cannot_login(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post(self.url, {'username': 'alice', 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_fields(self):
+        response = self.client.post(self.url, {'username': 'alice'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.json())
+
+    def test_login_rehashes_at_new_cost(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            response = self.client.post(self.url, {'username': 'alice', 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(self.user.check_password('pass1234'))
+
+
+class ProfilePictureTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.spool_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, self.spool_dir)
+        overrides = self.settings(
+            MEDIA_ROOT=media_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            PROFILE_PICTURE_SPOOL_DIR=self.spool_dir,
+            PROFILE_PICTURE_PROCESS_SYNC=True,
+            PROFILE_PICTURE_RENDITIONS={'small': 16, 'medium': 48},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, size=(80, 60), color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, format='PNG')
+        return SimpleUploadedFile('me.png', buffer.getvalue(), content_type='image/png')
+
+    def test_registration_defers_processing(self):
+        data = {'username': 'alice', 'password': 'pass1234', 'profile_picture': self.upload()}
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('register'), data, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('token', response.data)
+        user = CustomUser.objects.get(username='alice')
+        self.assertFalse(user.profile_picture)
+        self.assertEqual(len(list(self.spool_dir.iterdir())), 1)
+
+        for callback in callbacks:
+            callback()
+        user.refresh_from_db()
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+        with user.profile_picture.open() as picture, Image.open(picture) as image:
+            self.assertEqual(image.size, (80, 60))
+        self.assertEqual(set(user.profile_picture_renditions), {'source', 'small', 'medium'})
+        with user.profile_picture.storage.open(user.profile_picture_renditions['small']['webp']) as rendition:
+            with Image.open(rendition) as image:
+                self.assertEqual((image.format, image.size), ('WEBP', (16, 16)))
+
+        response = self.client.get(reverse('user-profile', args=[user.pk]))
+        avatar = response.data['avatar']
+        self.assertEqual(set(avatar), {'small', 'medium'})
+        self.assertRegex(avatar['medium']['jpeg'], rf'/profile_pics/{user.pk}/medium\.[0-9a-f]{{16}}\.jpg$')
+        self.assertRegex(avatar['medium']['webp'], r'\.webp$')
+
+    def test_picture_set_elsewhere_gets_renditions(self):
+        user = CustomUser.objects.create_user(username='bob', password='pass1234')
+        user.profile_picture = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        user.refresh_from_db()
+        self.assertEqual(user.profile_picture_renditions['source'], user.profile_picture.name)
+        self.assertEqual(set(user.profile_picture_renditions['small']), {'webp', 'jpeg'})
+
+    def test_replaced_renditions_are_deleted(self):
+        user = CustomUser.objects.create_user(username='bob', password='pass1234')
+        user.profile_picture = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        user.refresh_from_db()
+        old_small = user.profile_picture_renditions['small']['jpeg']
+        user.profile_picture = self.upload(color='blue')
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        user.refresh_from_db()
+        self.assertNotEqual(user.profile_picture_renditions['small']['jpeg'], old_small)
+        self.assertFalse(user.profile_picture.storage.exists(old_small))
+
+    def test_renditions_are_uploaded_as_immutable(self):
+        user = CustomUser.objects.create_user(username='bob', password='pass1234')
+        user.profile_picture = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        user.refresh_from_db()
+        storage = MediaStorage()
+        for name in rendition_paths(user.profile_picture_renditions):
+            self.assertEqual(storage.get_object_parameters(name)['CacheControl'], IMMUTABLE_CACHE_CONTROL)
+        # The picture as uploaded keeps its own name, which may be reused.
+        self.assertNotIn('CacheControl', storage.get_object_parameters(user.profile_picture.name))
+
+    def test_backfill_command(self):
+        user = CustomUser.objects.create_user(username='bob', password='pass1234')
+        user.profile_picture = self.upload()
+        # Saved without running on_commit, like a user from before renditions existed.
+        with self.captureOnCommitCallbacks():
+            user.save()
+        out = StringIO()
+        call_command('backfill_avatars', stdout=out)
+        self.assertIn('Rendered avatars for 1 users', out.getvalue())
+        user.refresh_from_db()
+        self.assertIn('medium', user.profile_picture_renditions)
+        call_command('backfill_avatars', stdout=out)
+        self.assertIn('Rendered avatars for 0 users', out.getvalue())
+
+    def test_leftover_spool_files_are_reprocessed(self):
+        user = CustomUser.objects.create_user(username='bob', password='pass1234')
+        (self.spool_dir / f'{user.pk}-leftover.png').write_bytes(self.upload().read())
+        call_command('process_profile_pictures', older_than=0, stdout=StringIO())
+        user.refresh_from_db()
+        self.assertTrue(user.profile_picture)
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+
+
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'follow': '2/min', 'login': '2/min'}
+        overrides = self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = CustomUser.objects.create_user(username='alice', password='pass1234')
+        self.others = [CustomUser.objects.create_user(username=f'user{index}', password='pass1234') for index in range(3)]
+
+    def test_sliding_window(self):
+        window = SlidingWindow('2/min')
+        self.assertEqual(window.hit('test', now=600), 0)
+        self.assertEqual(window.hit('test', now=601), 0)
+        self.assertEqual(window.hit('test', now=602), 58)
+        # Half way into the next window the previous one counts for half.
+        self.assertEqual(window.hit('test', now=690), 0)
+        self.assertEqual(window.hit('test', now=691), 0)
+        self.assertGreater(window.hit('test', now=692), 0)
+
+    def test_scope_limits_each_user(self):
+        self.client.force_authenticate(self.user)
+        for other in self.others[:2]:
+            response = self.client.post(reverse('follow-user', args=[other.pk]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse('follow-user', args=[self.others[2].pk]))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        self.client.force_authenticate(self.others[0])
+        response = self.client.post(reverse('follow-user', args=[self.others[2].pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unscoped_views_are_not_throttled(self):
+        for _ in range(5):
+            response = self.client.get(reverse('user-profile', args=[self.user.pk]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_login_is_throttled_per_address(self):
+        for _ in range(2):
+            self.client.post(reverse('login'), {'username': 'alice', 'password': 'wrong'}, format='json')
+        response = self.client.post(reverse('login'), {'username': 'alice', 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
@@ -1,11 +1,19 @@
 from django.urls import path
-from .views import RegisterView, LoginView, FollowUserView, UnfollowUserView
+from .views import (
+    RegisterView, LoginView, FollowUserView, UnfollowUserView, UserProfileView, FollowListView,
+    BulkFollowView, BulkUnfollowView,
+)
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow-user'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user'),
+    path('follow/bulk/', BulkFollowView.as_view(), name='bulk-follow'),
+    path('unfollow/bulk/', BulkUnfollowView.as_view(), name='bulk-unfollow'),
+    path('users/<int:pk>/', UserProfileView.as_view(), name='user-profile'),
+    path('users/<int:pk>/followers/', FollowListView.as_view(direction='followers'), name='user-followers'),
+    path('users/<int:pk>/following/', FollowListView.as_view(direction='following'), name='user-following'),
 ]
 
 
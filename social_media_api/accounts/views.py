@@ -1,29 +1,80 @@
+import json
+
+from django.contrib.auth import aauthenticate
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from rest_framework.views import APIView
-from .models import CustomUser
-from .serializers import UserRegistrationSerializer, UserLoginSerializer
+from rest_framework.throttling import BaseThrottle
+from posts.timeline import backfill_timeline, remove_authors_from_timeline
+from social_media_api.idempotency import IdempotencyKeyMixin
+from social_media_api.pagination import KeysetPagination
+from social_media_api.throttling import scope_window
+from .models import CustomUser, Follow
+from .serializers import (
+    UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer, FollowListSerializer, BulkFollowSerializer,
+)
 
 # Create your views here.
 
+def lock_follower(user):
+    # Follow changes by one user are serialized on their row, so the edges
+    # read after this are exactly the ones the following writes change.
+    list(CustomUser.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+
 class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserRegistrationSerializer
+    throttle_scope = 'register'
 
-class LoginView(APIView):
+@method_decorator(csrf_exempt, name='dispatch')
+class LoginView(View):
+    """
+    Async token login. Credentials go through AUTHENTICATION_BACKENDS, whose
+    HasherPoolModelBackend hashes on the hasher pool, so a burst of logins
+    does not hold a request worker per hash.
+    """
     serializer_class = UserLoginSerializer
+    throttle_scope = 'login'
 
-    def post(self, request):
-        serializer = self.serializer_class(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = serializer.validated_data
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({'token': token.key})
+    async def post(self, request):
+        # Not an APIView, so the login rate is checked here, per client address.
+        window = scope_window(self.throttle_scope)
+        wait = window and await window.ahit(f'{self.throttle_scope}:ip:{BaseThrottle().get_ident(request)}')
+        if wait:
+            return JsonResponse(
+                {'detail': f'Request was throttled. Expected available in {wait} seconds.'},
+                status=429,
+                headers={'Retry-After': str(wait)},
+            )
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({'detail': 'JSON parse error'}, status=400)
+        else:
+            data = request.POST
+        serializer = self.serializer_class(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        user = await aauthenticate(
+            request, username=serializer.validated_data['username'], password=serializer.validated_data['password'],
+        )
+        if user is None:
+            return JsonResponse({'non_field_errors': ['Invalid credentials']}, status=400)
+        token, created = await Token.objects.aget_or_create(user=user)
+        return JsonResponse({'token': token.key})
 
-class FollowUserView(generics.GenericAPIView):
+class FollowUserView(IdempotencyKeyMixin, generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'follow'
 
     def post(self, request, user_id):
         try:
@@ -32,18 +83,135 @@ class FollowUserView(generics.GenericAPIView):
             return Response({'detail': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
         if target_user == request.user:
             return Response({'detail': 'You cannot follow yourself.'}, status=status.HTTP_400_BAD_REQUEST)
-        request.user.following.add(target_user)
-        target_user.followers.add(request.user)
+        with transaction.atomic():
+            lock_follower(request.user)
+            follow, created = Follow.objects.get_or_create(follower=request.user, followee=target_user)
+            if created:
+                CustomUser.objects.filter(pk=request.user.pk).update(following_count=F('following_count') + 1)
+                CustomUser.objects.filter(pk=target_user.pk).update(follower_count=F('follower_count') + 1)
+        if created:
+            backfill_timeline(request.user, [target_user.pk])
         return Response({'detail': f'You are now following {target_user.username}.'})
 
 class UnfollowUserView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'follow'
 
     def post(self, request, user_id):
         try:
             target_user = CustomUser.objects.get(id=user_id)
         except CustomUser.DoesNotExist:
             return Response({'detail': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
-        request.user.following.remove(target_user)
-        target_user.followers.remove(request.user)
+        with transaction.atomic():
+            lock_follower(request.user)
+            deleted, _ = Follow.objects.filter(follower=request.user, followee=target_user).delete()
+            if deleted:
+                CustomUser.objects.filter(pk=request.user.pk, following_count__gt=0).update(following_count=F('following_count') - 1)
+                CustomUser.objects.filter(pk=target_user.pk, follower_count__gt=0).update(follower_count=F('follower_count') - 1)
+        remove_authors_from_timeline(request.user, [target_user.pk])
         return Response({'detail': f'You have unfollowed {target_user.username}.'})
+
+class UserProfileView(generics.RetrieveAPIView):
+    queryset = CustomUser.objects.all()
+    serializer_class = UserProfileSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+class FollowListView(generics.ListAPIView):
+    """
+    Followers or followings of a user, read from the Follow index.
+    Only the id, username and avatar of each user are loaded.
+    """
+    serializer_class = FollowListSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    # 'followers': edges pointing at the user; 'following': edges from them.
+    direction = 'followers'
+
+    def get_queryset(self):
+        user = generics.get_object_or_404(CustomUser.objects.only('pk'), pk=self.kwargs['pk'])
+        if self.direction == 'followers':
+            edges, other = Follow.objects.filter(followee=user), 'follower'
+        else:
+            edges, other = Follow.objects.filter(follower=user), 'followee'
+        return edges.values(
+            'id', 'created_at',
+            user_id=F(f'{other}_id'),
+            username=F(f'{other}__username'),
+            profile_picture_renditions=F(f'{other}__profile_picture_renditions'),
+        )
+
+class BulkFollowView(generics.GenericAPIView):
+    """
+    Follow up to FOLLOW_BULK_MAX_IDS users in a fixed number of queries.
+    Responds with a status per requested id.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'follow'
+    serializer_class = BulkFollowSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = serializer.validated_data['user_ids']
+
+        found = set(CustomUser.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        with transaction.atomic():
+            lock_follower(request.user)
+            following = set(
+                Follow.objects.filter(follower=request.user, followee_id__in=found).values_list('followee_id', flat=True)
+            )
+            results, to_follow = [], []
+            for user_id in user_ids:
+                if user_id == request.user.pk:
+                    result = 'self'
+                elif user_id not in found:
+                    result = 'not_found'
+                elif user_id in following:
+                    result = 'already_following'
+                else:
+                    result = 'followed'
+                    to_follow.append(user_id)
+                results.append({'id': user_id, 'status': result})
+
+            if to_follow:
+                Follow.objects.bulk_create(
+                    [Follow(follower=request.user, followee_id=user_id) for user_id in to_follow],
+                    batch_size=500,
+                    ignore_conflicts=True,
+                )
+                CustomUser.objects.filter(pk=request.user.pk).update(following_count=F('following_count') + len(to_follow))
+                CustomUser.objects.filter(pk__in=to_follow).update(follower_count=F('follower_count') + 1)
+        if to_follow:
+            backfill_timeline(request.user, to_follow)
+        return Response({'results': results})
+
+class BulkUnfollowView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'follow'
+    serializer_class = BulkFollowSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = serializer.validated_data['user_ids']
+
+        edges = Follow.objects.filter(follower=request.user, followee_id__in=user_ids)
+        followed = set(edges.values_list('followee_id', flat=True))
+        if followed:
+            with transaction.atomic():
+                lock_follower(request.user)
+                # Read again under the lock, as a concurrent unfollow may have won.
+                followed = set(edges.values_list('followee_id', flat=True))
+                edges.filter(followee_id__in=followed).delete()
+                CustomUser.objects.filter(pk=request.user.pk).update(
+                    following_count=Greatest(F('following_count') - len(followed), 0),
+                )
+                CustomUser.objects.filter(pk__in=followed, follower_count__gt=0).update(
+                    follower_count=F('follower_count') - 1,
+                )
+        if followed:
+            remove_authors_from_timeline(request.user, followed)
+        return Response({'results': [
+            {'id': user_id, 'status': 'unfollowed' if user_id in followed else 'not_following'}
+            for user_id in user_ids
+        ]})
@@ -0,0 +1,39 @@
+from django.conf import settings
+
+from .models import Notification
+
+
+def _chunks(queryset):
+    # Each chunk is one `UPDATE/DELETE ... WHERE id IN (SELECT id ... LIMIT n)`
+    # statement, so very large inboxes never hold locks for long.
+    return Notification.objects.filter(
+        pk__in=queryset.order_by().values('pk')[:settings.NOTIFICATIONS_BULK_CHUNK_SIZE]
+    )
+
+
+def mark_read(queryset):
+    """
+    Mark the unread notifications in `queryset` as read; returns the row count.
+    """
+    queryset = queryset.filter(is_read=False)
+    total = 0
+    while True:
+        updated = _chunks(queryset).update(is_read=True)
+        total += updated
+        if updated < settings.NOTIFICATIONS_BULK_CHUNK_SIZE:
+            return total
+
+
+def delete_read(queryset):
+    """
+    Delete the read notifications in `queryset`; returns the row count.
+    """
+    queryset = queryset.filter(is_read=True)
+    total = 0
+    while True:
+        # The total also counts cascaded NotificationActor rows.
+        _, per_model = _chunks(queryset).delete()
+        deleted = per_model.get(Notification._meta.label, 0)
+        total += deleted
+        if deleted < settings.NOTIFICATIONS_BULK_CHUNK_SIZE:
+            return total
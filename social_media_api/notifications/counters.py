@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Notification
+
+
+def unread_cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user):
+    """
+    Cached number of unread notifications, falling back to a COUNT over the
+    partial unread index when the counter is missing or expired.
+    """
+    key = unread_cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient=user, is_read=False).count()
+        cache.add(key, count, settings.NOTIFICATIONS_UNREAD_COUNT_TTL)
+    return count
+
+
+def adjust_unread_count(user_id, delta):
+    # Only adjust a live counter; a missing one is rebuilt on the next read.
+    try:
+        cache.incr(unread_cache_key(user_id), delta)
+    except ValueError:
+        pass
+
+
+def reset_unread_count(user_id):
+    cache.delete(unread_cache_key(user_id))
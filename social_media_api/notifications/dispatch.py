@@ -0,0 +1,158 @@
+import atexit
+import threading
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .counters import adjust_unread_count
+from .models import Notification, NotificationActor
+from .pubsub import broker
+
+NotificationEvent = namedtuple(
+    'NotificationEvent',
+    ['recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id'],
+)
+
+
+def write_events(events):
+    """
+    Store a batch of events, coalescing them by (recipient, verb, target).
+
+    Events matching an unread notification bump its actor, and its
+    actor_count for actors not yet recorded in NotificationActor; the rest
+    become new rows in a single bulk insert. Returns the list of
+    created notifications.
+    """
+    groups = {}
+    for event in events:
+        key = (event.recipient_id, event.verb, event.target_content_type_id, event.target_object_id)
+        actors = groups.setdefault(key, [])
+        if event.actor_id in actors:
+            actors.remove(event.actor_id)
+        actors.append(event.actor_id)
+    if not groups:
+        return []
+
+    target_ids = {key[3] for key in groups}
+    same_target = Q(target_object_id__in=target_ids - {None})
+    if None in target_ids:
+        same_target |= Q(target_object_id__isnull=True)
+
+    now = timezone.now()
+    with transaction.atomic():
+        unread = Notification.objects.filter(
+            same_target,
+            is_read=False,
+            recipient_id__in={key[0] for key in groups},
+            verb__in={key[1] for key in groups},
+        ).values_list('pk', 'recipient_id', 'verb', 'target_content_type_id', 'target_object_id')
+        existing = {tuple(row[1:]): row[0] for row in unread}
+
+        coalesced = {existing[key]: actors for key, actors in groups.items() if key in existing}
+        counted = set()
+        if coalesced:
+            counted = set(NotificationActor.objects.filter(
+                notification_id__in=coalesced,
+                actor_id__in={actor_id for actors in coalesced.values() for actor_id in actors},
+            ).values_list('notification_id', 'actor_id'))
+        new_actors = []
+        for pk, actors in coalesced.items():
+            uncounted = [actor_id for actor_id in actors if (pk, actor_id) not in counted]
+            Notification.objects.filter(pk=pk).update(
+                actor_id=actors[-1],
+                actor_count=F('actor_count') + len(uncounted),
+                timestamp=now,
+            )
+            new_actors += [NotificationActor(notification_id=pk, actor_id=actor_id) for actor_id in uncounted]
+
+        fresh = [(key, actors) for key, actors in groups.items() if key not in existing]
+        created = Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient_id=key[0],
+                    actor_id=actors[-1],
+                    verb=key[1],
+                    target_content_type_id=key[2],
+                    target_object_id=key[3],
+                    actor_count=len(actors),
+                )
+                for key, actors in fresh
+            ],
+            batch_size=500,
+        )
+        for notification, (_, actors) in zip(created, fresh):
+            new_actors += [NotificationActor(notification_id=notification.pk, actor_id=actor_id) for actor_id in actors]
+        NotificationActor.objects.bulk_create(new_actors, batch_size=500, ignore_conflicts=True)
+    for recipient_id, count in Counter(notification.recipient_id for notification in created).items():
+        transaction.on_commit(lambda recipient_id=recipient_id, count=count: adjust_unread_count(recipient_id, count))
+    for recipient_id in {key[0] for key in groups}:
+        transaction.on_commit(lambda recipient_id=recipient_id: broker.publish(recipient_id))
+    return created
+
+
+class NotificationDispatcher:
+    """
+    Queue of notification events written off the request thread.
+
+    Events are flushed through write_events() when NOTIFICATIONS_DISPATCH_MAX_SIZE
+    are queued or NOTIFICATIONS_DISPATCH_INTERVAL seconds after the first one.
+    With NOTIFICATIONS_DISPATCH_SYNC set they are written immediately instead.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def __len__(self):
+        return len(self._events)
+
+    def enqueue(self, *events):
+        if settings.NOTIFICATIONS_DISPATCH_SYNC:
+            write_events(events)
+            return
+        with self._lock:
+            self._events.extend(events)
+            if self._timer is None:
+                self._timer = threading.Timer(settings.NOTIFICATIONS_DISPATCH_INTERVAL, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+            full = len(self._events) >= settings.NOTIFICATIONS_DISPATCH_MAX_SIZE
+        if full:
+            threading.Thread(target=self._flush_on_timer, daemon=True).start()
+
+    def flush(self):
+        with self._lock:
+            events, self._events = self._events, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return write_events(events)
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+
+dispatcher = NotificationDispatcher()
+atexit.register(dispatcher.flush)
+
+
+def notify(recipient, actor, verb, target=None):
+    # The recipient may be given by id, so callers need not load the user.
+    recipient_id = getattr(recipient, 'pk', recipient)
+    if recipient_id == actor.pk:
+        return
+    dispatcher.enqueue(NotificationEvent(
+        recipient_id=recipient_id,
+        actor_id=actor.pk,
+        verb=verb,
+        target_content_type_id=ContentType.objects.get_for_model(target).pk if target is not None else None,
+        target_object_id=target.pk if target is not None else None,
+    ))
@@ -12,6 +12,36 @@ class Notification(models.Model):
     target = GenericForeignKey('target_content_type', 'target_object_id')
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    # Unread events sharing (recipient, verb, target) are coalesced into one
+    # row; `actor` is the most recent actor and `actor_count` the total.
+    actor_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-timestamp', '-id']),
+            models.Index(fields=['recipient', 'target_content_type', 'target_object_id']),
+            models.Index(
+                fields=['recipient', '-timestamp'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.actor} {self.verb} {self.target} for {self.recipient}"
+
+    @property
+    def summary(self):
+        others = self.actor_count - 1
+        if others > 0:
+            return f"{self.actor} and {others} other{'s' if others > 1 else ''} {self.verb}"
+        return f"{self.actor} {self.verb}"
+
+
+class NotificationActor(models.Model):
+    """An actor already counted in a coalesced notification's actor_count."""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='counted_actors')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('notification', 'actor')
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class NotificationBroker:
+    """
+    In-process pub/sub that wakes streaming clients when their notifications change.
+
+    Subscribers are asyncio events bound to the loop that created them;
+    publish() may be called from any thread. Only processes sharing this
+    broker are woken, so streams also re-check on a timeout.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            self._subscribers[user_id].discard(subscription)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for loop, event in subscriptions:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+
+broker = NotificationBroker()
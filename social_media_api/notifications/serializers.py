@@ -1,9 +1,35 @@
 from rest_framework import serializers
+from accounts.serializers import AvatarField
+from social_media_api.sparse_fields import SparseFieldsetMixin
 from .models import Notification
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     actor = serializers.StringRelatedField()
+    actor_avatar = AvatarField(source='actor.profile_picture_renditions')
     recipient = serializers.StringRelatedField()
+    summary = serializers.CharField(read_only=True)
+    target = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
-        fields = ['id', 'recipient', 'actor', 'verb', 'target_object_id', 'timestamp', 'is_read']
\ No newline at end of file
+        fields = [
+            'id', 'recipient', 'actor', 'actor_avatar', 'actor_count', 'verb', 'summary',
+            'target_object_id', 'target', 'timestamp', 'is_read',
+        ]
+        select_related = ['actor', 'recipient']
+        # Generic prefetch: one query per target content type, not per row.
+        prefetch_related = ['target']
+        field_sources = {'summary': ['actor', 'actor_count', 'verb'], 'target': ['target']}
+
+    def get_target(self, obj):
+        target = obj.target
+        if target is None:
+            return None
+        summary = {'type': target._meta.model_name, 'id': target.pk}
+        if hasattr(target, 'title'):
+            summary['title'] = target.title
+        return summary
+
+
+class NotificationCutoffSerializer(serializers.Serializer):
+    timestamp = serializers.DateTimeField()
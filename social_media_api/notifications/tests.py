@@ -1,3 +1,241 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from posts.models import Comment, Post
+from social_media_api.testing import QueryBudgetMixin
+from .dispatch import dispatcher, notify
+from .models import Notification
+from .pubsub import broker
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATIONS_DISPATCH_INTERVAL=3600, NOTIFICATIONS_DISPATCH_MAX_SIZE=1000)
+class DispatchTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='alice', password='pass12345')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(3)]
+        self.post = Post.objects.create(author=self.author, title='Hello', content='body')
+        self.addCleanup(dispatcher.flush)
+
+    def test_events_are_queued_until_flush(self):
+        notify(self.author, self.fans[0], 'liked your post', self.post)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(len(dispatcher.flush()), 1)
+        self.assertEqual(Notification.objects.get().target, self.post)
+
+    def test_self_notifications_are_dropped(self):
+        notify(self.author, self.author, 'liked your post', self.post)
+        self.assertEqual(len(dispatcher), 0)
+
+    def test_events_coalesce_by_recipient_verb_and_target(self):
+        for fan in self.fans:
+            notify(self.author, fan, 'liked your post', self.post)
+        dispatcher.flush()
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, self.fans[-1])
+        self.assertEqual(notification.summary, 'fan2 and 2 others liked your post')
+
+        # A repeat actor in a later batch, e.g. after unlike and like, is not recounted.
+        notify(self.author, self.fans[0], 'liked your post', self.post)
+        self.assertEqual(dispatcher.flush(), [])
+        notification.refresh_from_db()
+        self.assertEqual((notification.actor, notification.actor_count), (self.fans[0], 3))
+        self.assertEqual(notification.summary, 'fan0 and 2 others liked your post')
+
+    def test_read_notifications_are_not_reopened(self):
+        notify(self.author, self.fans[0], 'liked your post', self.post)
+        dispatcher.flush()
+        Notification.objects.update(is_read=True)
+        notify(self.author, self.fans[1], 'liked your post', self.post)
+        dispatcher.flush()
+        self.assertEqual(Notification.objects.filter(is_read=False).get().summary, 'fan1 liked your post')
+
+
+@override_settings(NOTIFICATIONS_DISPATCH_SYNC=True)
+class UnreadCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='alice', password='pass12345')
+        self.fan = User.objects.create_user(username='bob', password='pass12345')
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {i}', content='body') for i in range(2)]
+        self.client.force_authenticate(self.author)
+
+    def unread(self):
+        response = self.client.get(reverse('notifications:unread-notification-count'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['unread']
+
+    def test_counter_follows_new_and_read_notifications(self):
+        self.assertEqual(self.unread(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in self.posts:
+                notify(self.author, self.fan, 'liked your post', post)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 2)
+
+        notification = Notification.objects.first()
+        self.client.post(reverse('notifications:mark-notification-read', kwargs={'pk': notification.pk}))
+        self.client.post(reverse('notifications:mark-notification-read', kwargs={'pk': notification.pk}))
+        self.assertEqual(self.unread(), 1)
+
+    def test_missing_counter_is_rebuilt(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.author, self.fan, 'liked your post', self.posts[0])
+        cache.clear()
+        self.assertEqual(self.unread(), 1)
+
+    def test_cannot_mark_someone_elses_notification(self):
+        notify(self.author, self.fan, 'liked your post', self.posts[0])
+        self.client.force_authenticate(self.fan)
+        response = self.client.post(
+            reverse('notifications:mark-notification-read', kwargs={'pk': Notification.objects.get().pk})
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(NOTIFICATIONS_BULK_CHUNK_SIZE=2)
+class BulkNotificationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.actor = User.objects.create_user(username='bob', password='pass12345')
+        self.other = User.objects.create_user(username='carol', password='pass12345')
+        now = timezone.now()
+        for days in range(5):
+            notification = Notification.objects.create(recipient=self.user, actor=self.actor, verb='poked you')
+            Notification.objects.filter(pk=notification.pk).update(timestamp=now - timedelta(days=days))
+        Notification.objects.create(recipient=self.other, actor=self.actor, verb='poked you')
+        self.client.force_authenticate(self.user)
+
+    def test_mark_all_read_runs_in_chunks(self):
+        self.client.get(reverse('notifications:unread-notification-count'))
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('notifications:mark-all-read'))
+        self.assertEqual(response.data, {'updated': 5})
+        self.assertFalse(Notification.objects.filter(recipient=self.user, is_read=False).exists())
+        self.assertTrue(Notification.objects.filter(recipient=self.other, is_read=False).exists())
+        self.assertEqual(self.client.get(reverse('notifications:unread-notification-count')).data['unread'], 0)
+
+    def test_mark_read_until(self):
+        cutoff = timezone.now() - timedelta(days=2, hours=12)
+        response = self.client.post(reverse('notifications:mark-read-until'), {'timestamp': cutoff.isoformat()})
+        self.assertEqual(response.data, {'updated': 2})
+
+    def test_delete_read_older_than(self):
+        Notification.objects.filter(recipient=self.user).update(is_read=True)
+        cutoff = timezone.now() - timedelta(days=1, hours=12)
+        response = self.client.post(reverse('notifications:delete-read-older-than'), {'timestamp': cutoff.isoformat()})
+        self.assertEqual(response.data, {'deleted': 3})
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_cutoff_is_required(self):
+        response = self.client.post(reverse('notifications:mark-read-until'), {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NotificationListTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        for i in range(4):
+            actor = User.objects.create_user(username=f'fan{i}', password='pass12345')
+            post = Post.objects.create(author=self.user, title=f'Post {i}', content='body')
+            comment = Comment.objects.create(post=post, author=actor, content='nice')
+            Notification.objects.create(recipient=self.user, actor=actor, verb='liked your post', target=post)
+            Notification.objects.create(recipient=self.user, actor=actor, verb='commented on your post', target=comment)
+        self.client.force_authenticate(self.user)
+
+    def test_targets_are_resolved_in_one_query_per_type(self):
+        # Page, one prefetch per target type, and at most one content type lookup each.
+        with self.assertQueryBudget(5):
+            response = self.client.get(reverse('notifications:notifications'))
+        results = response.data['results']
+        self.assertEqual(len(results), 8)
+        post = Post.objects.get(title='Post 3')
+        self.assertIn({'type': 'post', 'id': post.pk, 'title': 'Post 3'}, [row['target'] for row in results])
+
+    def test_sparse_fieldset_skips_target_prefetch(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse('notifications:notifications'), {'fields': 'id,summary'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'summary'})
+        self.assertEqual(response.data['results'][0]['summary'], 'fan3 commented on your post')
+
+
+@override_settings(NOTIFICATIONS_DISPATCH_SYNC=True, NOTIFICATIONS_STREAM_TIMEOUT=5)
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.fan = User.objects.create_user(username='bob', password='pass12345')
+        self.post = Post.objects.create(author=self.user, title='Hello', content='body')
+        self.token = Token.objects.create(user=self.user)
+
+    async def open_stream(self, **params):
+        response = await self.async_client.get(
+            reverse('notifications:notification-stream'), params,
+            headers={'authorization': f'Token {self.token.key}'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.streaming_content
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse('notifications:notification-stream'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_replays_backlog_since_cursor(self):
+        since = timezone.now() - timedelta(minutes=1)
+        await sync_to_async(notify)(self.user, self.fan, 'liked your post', self.post)
+        stream = await self.open_stream(since=since.isoformat())
+        event = await asyncio.wait_for(anext(stream), 1)
+        self.assertIn(b'event: notification', event)
+        self.assertIn(b'bob liked your post', event)
+        await stream.aclose()
+
+    async def test_published_notifications_are_pushed(self):
+        stream = await self.open_stream()
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        self.assertFalse(pending.done())
+
+        # captureOnCommitCallbacks can't wrap an await, so publish by hand.
+        await sync_to_async(notify)(self.user, self.fan, 'liked your post', self.post)
+        broker.publish(self.user.pk)
+        event = await asyncio.wait_for(pending, 1)
+        self.assertIn(b'bob liked your post', event)
+        await stream.aclose()
+
+    @override_settings(NOTIFICATIONS_STREAM_BATCH_SIZE=1)
+    async def test_resumes_between_rows_sharing_a_timestamp(self):
+        posts = await sync_to_async(lambda: [
+            Post.objects.create(author=self.user, title=f'Post {index}', content='body') for index in range(2)
+        ])()
+        for post in posts:
+            await sync_to_async(notify)(self.user, self.fan, 'liked your post', post)
+        tied = timezone.now()
+        await Notification.objects.aupdate(timestamp=tied)
+
+        stream = await self.open_stream(since=(tied - timedelta(seconds=1)).isoformat())
+        first = await asyncio.wait_for(anext(stream), 1)
+        await stream.aclose()
+        event_id = first.decode().split('\n')[0].removeprefix('id: ')
+        first_pk = await Notification.objects.order_by('id').values_list('id', flat=True).afirst()
+        self.assertEqual(event_id, f'{tied.isoformat()},{first_pk}')
+
+        response = await self.async_client.get(
+            reverse('notifications:notification-stream'),
+            headers={'authorization': f'Token {self.token.key}', 'last-event-id': event_id},
+        )
+        stream = response.streaming_content
+        second = await asyncio.wait_for(anext(stream), 1)
+        await stream.aclose()
+        self.assertIn(f',{first_pk + 1}\n'.encode(), second)
@@ -1,9 +1,19 @@
 from django.urls import path
-from .views import NotificationListView, UnreadNotificationListView
+from .views import (
+    NotificationListView, UnreadNotificationListView, UnreadNotificationCountView, MarkNotificationReadView,
+    MarkAllNotificationsReadView, MarkNotificationsReadUntilView, DeleteReadNotificationsView,
+    NotificationStreamView,
+)
 
 app_name = 'notifications'  # Add this line for namespacing
 
 urlpatterns = [
     path('', NotificationListView.as_view(), name='notifications'),
     path('unread/', UnreadNotificationListView.as_view(), name='unread-notifications'),
-]
\ No newline at end of file
+    path('unread/count/', UnreadNotificationCountView.as_view(), name='unread-notification-count'),
+    path('<int:pk>/read/', MarkNotificationReadView.as_view(), name='mark-notification-read'),
+    path('mark-all-read/', MarkAllNotificationsReadView.as_view(), name='mark-all-read'),
+    path('mark-read-until/', MarkNotificationsReadUntilView.as_view(), name='mark-read-until'),
+    path('delete-read-older-than/', DeleteReadNotificationsView.as_view(), name='delete-read-older-than'),
+    path('stream/', NotificationStreamView.as_view(), name='notification-stream'),
+]
@@ -1,20 +1,174 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import generics, permissions
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views import View
+from rest_framework import exceptions, generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from social_media_api.eager_loading import EagerLoadingMixin, eager_load
+from social_media_api.pagination import TimestampKeysetPagination
+from .bulk import delete_read, mark_read
+from .counters import adjust_unread_count, reset_unread_count, unread_count
 from .models import Notification
-from .serializers import NotificationSerializer
+from .pubsub import broker
+from .serializers import NotificationCutoffSerializer, NotificationSerializer
 
 # Create your views here.
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(EagerLoadingMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimestampKeysetPagination
 
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user).order_by('-timestamp')
 
-class UnreadNotificationListView(generics.ListAPIView):
+class UnreadNotificationListView(EagerLoadingMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimestampKeysetPagination
 
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user, is_read=False).order_by('-timestamp')
+
+
+class UnreadNotificationCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread': unread_count(request.user)})
+
+class MarkNotificationReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        notification = generics.get_object_or_404(Notification, pk=pk, recipient=request.user)
+        if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+            adjust_unread_count(request.user.pk, -1)
+        return Response({'detail': 'Notification marked as read.'}, status=status.HTTP_200_OK)
+
+class MarkAllNotificationsReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        updated = mark_read(Notification.objects.filter(recipient=request.user))
+        reset_unread_count(request.user.pk)
+        return Response({'updated': updated})
+
+class MarkNotificationsReadUntilView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = NotificationCutoffSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = mark_read(Notification.objects.filter(
+            recipient=request.user, timestamp__lte=serializer.validated_data['timestamp'],
+        ))
+        reset_unread_count(request.user.pk)
+        return Response({'updated': updated})
+
+class DeleteReadNotificationsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = NotificationCutoffSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted = delete_read(Notification.objects.filter(
+            recipient=request.user, timestamp__lt=serializer.validated_data['timestamp'],
+        ))
+        return Response({'deleted': deleted})
+
+
+def authenticate_stream(request):
+    # Plain Django view, so run DRF's configured authenticators by hand.
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+def parse_stream_position(value):
+    """
+    Stream position from an event id, `<timestamp>,<id>`, or from a bare
+    `<timestamp>`. Returns None if the value can't be parsed.
+    """
+    timestamp, _, pk = value.partition(',')
+    try:
+        since = parse_datetime(timestamp)
+        pk = int(pk) if pk else None
+    except ValueError:
+        return None
+    return None if since is None else (since, pk)
+
+def notifications_since(user, position):
+    # (timestamp, id) > position, so rows sharing a timestamp are neither
+    # skipped nor repeated across batches.
+    since, pk = position
+    after = Q(timestamp__gt=since)
+    if pk is not None:
+        after |= Q(timestamp=since, id__gt=pk)
+    queryset = Notification.objects.filter(after, recipient=user).order_by('timestamp', 'id')
+    rows = list(eager_load(queryset, NotificationSerializer)[:settings.NOTIFICATIONS_STREAM_BATCH_SIZE])
+    return rows, NotificationSerializer(rows, many=True).data
+
+class NotificationStreamView(View):
+    """
+    Server-sent events stream of the user's new or updated notifications.
+
+    Clients resume with the Last-Event-ID header, a (timestamp, id) position,
+    or with ?since=<timestamp>. The database is only read when the broker
+    signals a change for this user, or every NOTIFICATIONS_STREAM_TIMEOUT
+    seconds as a keep-alive. Serve it through asgi.py; under WSGI each stream
+    holds a worker.
+    """
+
+    async def get(self, request):
+        try:
+            user = await sync_to_async(authenticate_stream)(request)
+        except exceptions.AuthenticationFailed as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if user is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        cursor = request.GET.get('since') or request.headers.get('Last-Event-ID')
+        if cursor:
+            position = parse_stream_position(cursor)
+            if position is None:
+                return JsonResponse({'detail': 'Invalid since timestamp.'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            position = (timezone.now(), None)
+
+        response = StreamingHttpResponse(self.events(user, position), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, user, position):
+        subscription = broker.subscribe(user.pk)
+        _, changed = subscription
+        try:
+            while True:
+                changed.clear()
+                rows, data = await sync_to_async(notifications_since)(user, position)
+                for row, item in zip(rows, data):
+                    position = (row.timestamp, row.pk)
+                    event_id = f'{row.timestamp.isoformat()},{row.pk}'
+                    yield f'id: {event_id}\nevent: notification\ndata: {json.dumps(item)}\n\n'
+                if len(rows) == settings.NOTIFICATIONS_STREAM_BATCH_SIZE:
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), settings.NOTIFICATIONS_STREAM_TIMEOUT)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+        finally:
+            broker.unsubscribe(user.pk, subscription)
@@ -0,0 +1,131 @@
+import atexit
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from notifications.dispatch import NotificationEvent, dispatcher
+from social_media_api.response_cache import invalidate
+from .models import Like, Post
+from .trending import record_activity
+
+
+def insert_like(user_id, post_id):
+    try:
+        with transaction.atomic():
+            Like.objects.create(user_id=user_id, post_id=post_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def write_likes(pairs):
+    """
+    Persist (user_id, post_id) pairs in bulk and bump the matching counters.
+    Counters, scores and notifications follow the rows this call inserted, so
+    pairs another process wrote first are not counted twice. Returns the number
+    of likes that were new.
+    """
+    pairs = set(pairs)
+    authors = dict(Post.objects.filter(pk__in={post_id for _, post_id in pairs}).values_list('pk', 'author_id'))
+    existing = set(
+        Like.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            post_id__in=authors,
+        ).values_list('user_id', 'post_id')
+    )
+    new = [(user_id, post_id) for user_id, post_id in pairs if post_id in authors and (user_id, post_id) not in existing]
+    if not new:
+        return 0
+
+    post_type = ContentType.objects.get_for_model(Post)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Like.objects.bulk_create(
+                    [Like(user_id=user_id, post_id=post_id) for user_id, post_id in new],
+                    batch_size=500,
+                )
+        except IntegrityError:
+            # Some pairs were written elsewhere since they were read, e.g. by
+            # another worker's buffer; insert one at a time to learn which.
+            new = [(user_id, post_id) for user_id, post_id in new if insert_like(user_id, post_id)]
+        for post_id, count in Counter(post_id for _, post_id in new).items():
+            Post.objects.filter(pk=post_id).update(like_count=F('like_count') + count)
+            record_activity(post_id, 'like', count=count)
+    if not new:
+        return 0
+    # bulk_create sends no signals.
+    invalidate('posts')
+    dispatcher.enqueue(*(
+        NotificationEvent(authors[post_id], user_id, 'liked your post', post_type.pk, post_id)
+        for user_id, post_id in new
+        if authors[post_id] != user_id
+    ))
+    return len(new)
+
+
+class LikeBuffer:
+    """
+    Write-behind buffer for likes.
+
+    Likes are deduplicated on (user, post) in memory and written in one batch
+    once LIKE_BUFFER_MAX_SIZE are pending or LIKE_BUFFER_FLUSH_INTERVAL
+    seconds have passed, off the request thread. Pending likes live in this process only, so a crash
+    loses at most one interval's worth.
+    """
+
+    def __init__(self):
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, user_id, post_id):
+        with self._lock:
+            if (user_id, post_id) in self._pending:
+                return False
+            self._pending.add((user_id, post_id))
+            full = len(self._pending) >= settings.LIKE_BUFFER_MAX_SIZE
+            if not full and self._timer is None:
+                self._timer = threading.Timer(settings.LIKE_BUFFER_FLUSH_INTERVAL, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self._flush_in_background()
+        return True
+
+    def discard(self, user_id, post_id):
+        with self._lock:
+            if (user_id, post_id) not in self._pending:
+                return False
+            self._pending.discard((user_id, post_id))
+            return True
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+        return write_likes(pending)
+
+    def _flush_in_background(self):
+        threading.Thread(target=self._flush_on_timer, daemon=True).start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+
+like_buffer = LikeBuffer()
+atexit.register(like_buffer.flush)
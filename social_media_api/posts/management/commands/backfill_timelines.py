@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import fan_out_pending_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Fan out posts that were never pushed into timelines, e.g. those written before posts.0003, '
+        'for authors within TIMELINE_FANOUT_LIMIT. Run once after migrating.'
+    )
+
+    def handle(self, *args, **options):
+        moved = fan_out_pending_posts()
+        self.stdout.write(self.style.SUCCESS(f'Fanned out pending posts of {moved} authors.'))
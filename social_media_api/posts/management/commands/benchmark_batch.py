@@ -0,0 +1,63 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from posts.models import Post, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Compare the latency of a home-screen load as separate GETs and as one /api/batch/ request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=6)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        # Concurrent sub-requests use their own connections, so the data is
+        # committed and removed afterwards instead of rolled back.
+        author = User.objects.create_user(username='bench-batch-author', password='bench-batch')
+        reader = User.objects.create_user(username='bench-batch-reader', password='bench-batch')
+        try:
+            posts = Post.objects.bulk_create(
+                [Post(author=author, title=f'Post {index}', content='body ' * 50) for index in range(options['posts'])]
+            )
+            TimelineEntry.objects.bulk_create([
+                TimelineEntry(owner=reader, post=post, author=author, post_created_at=post.created_at) for post in posts
+            ])
+            token = Token.objects.create(user=reader)
+            paths = [reverse('feed'), reverse('notifications:unread-notifications')]
+            paths += [reverse('post-detail', args=[post.pk]) for post in posts]
+            with override_settings(ALLOWED_HOSTS=['*'], SECURE_SSL_REDIRECT=False):
+                self.compare(Client(HTTP_AUTHORIZATION=f'Token {token.key}'), paths, options['rounds'])
+        finally:
+            author.delete()
+            reader.delete()
+
+    def compare(self, client, paths, rounds):
+        def separate():
+            for path in paths:
+                assert client.get(path).status_code == 200
+
+        def batch(concurrent):
+            body = {'requests': [{'path': path} for path in paths], 'concurrent': concurrent}
+            response = client.post(reverse('batch'), body, content_type='application/json')
+            assert all(result['status'] == 200 for result in response.json()['responses'])
+
+        for label, run in (
+            (f'{len(paths)} separate GETs', separate),
+            ('batch, sequential', lambda: batch(False)),
+            ('batch, concurrent', lambda: batch(True)),
+        ):
+            run()
+            started = time.perf_counter()
+            for _ in range(rounds):
+                cache.clear()
+                run()
+            self.stdout.write(f'{label:22} {(time.perf_counter() - started) / rounds * 1000:8.2f} ms per home screen')
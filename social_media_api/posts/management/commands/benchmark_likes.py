@@ -0,0 +1,58 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from posts.like_buffer import like_buffer
+from posts.models import Post
+from posts.views import LikePostView
+
+
+class Command(BaseCommand):
+    help = 'Compare likes/sec of the synchronous and write-behind LikePostView paths. Changes are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--likes', type=int, default=2000, help='Likes per run, all on one post.')
+
+    def handle(self, *args, **options):
+        count = options['likes']
+        # Notifications are written inline: dispatcher threads could not see
+        # this uncommitted transaction either.
+        with override_settings(NOTIFICATIONS_DISPATCH_SYNC=True), transaction.atomic():
+            users = get_user_model().objects.bulk_create(
+                [get_user_model()(username=f'bench-like-{i}') for i in range(count * 2 + 1)]
+            )
+            author = users.pop()
+            sync_post = Post.objects.create(author=author, title='bench sync', content='')
+            buffered_post = Post.objects.create(author=author, title='bench buffered', content='')
+
+            sync_rate = self.run(users[:count], sync_post, buffered=False)
+            # Size-triggered flushes only, and run inline: the flush thread's
+            # own connection could not see this transaction's users and post.
+            with override_settings(LIKE_BUFFER_ENABLED=True, LIKE_BUFFER_MAX_SIZE=500, LIKE_BUFFER_FLUSH_INTERVAL=3600), \
+                    mock.patch.object(like_buffer, '_flush_in_background', like_buffer.flush):
+                buffered_rate = self.run(users[count:], buffered_post, buffered=True)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'synchronous:  {sync_rate:10.1f} likes/sec')
+        self.stdout.write(f'write-behind: {buffered_rate:10.1f} likes/sec ({buffered_rate / sync_rate:.1f}x)')
+
+    def run(self, users, post, buffered):
+        factory = APIRequestFactory()
+        view = LikePostView.as_view()
+        started = time.perf_counter()
+        for user in users:
+            request = factory.post(f'/api/posts/posts/{post.pk}/like/')
+            force_authenticate(request, user=user)
+            view(request, pk=post.pk)
+        if buffered:
+            like_buffer.flush()
+        elapsed = time.perf_counter() - started
+        post.refresh_from_db()
+        assert post.like_count == len(users), 'benchmark lost likes'
+        return len(users) / elapsed
@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from social_media_api.throttling import SlidingWindow, throttle_cache
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request cost of ScopedSlidingWindowThrottle against an unthrottled view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=50)
+
+    def handle(self, *args, **options):
+        count, user_count = options['requests'], options['users']
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'benchmark': f'{count}/hour'}
+        with transaction.atomic(), override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates},
+        ):
+            User = get_user_model()
+            users = User.objects.bulk_create([User(username=f'bench-throttle-{index}') for index in range(user_count)])
+            throttle_cache().clear()
+
+            window = SlidingWindow('1000000/min')
+            started = time.perf_counter()
+            for index in range(count):
+                window.hit(f'benchmark:user:{index % user_count}')
+            check = (time.perf_counter() - started) / count
+            self.stdout.write(f'{"SlidingWindow.hit()":24} {check * 1e6:8.1f} us/check')
+
+            rates = {}
+            for scope in (None, 'benchmark'):
+                rates[scope] = self.run(scope, users, count)
+                self.stdout.write(f'{"scope=" + str(scope):24} {rates[scope]:8.1f} requests/sec')
+            overhead = 1 / rates['benchmark'] - 1 / rates[None]
+            self.stdout.write(f'throttle overhead        {overhead * 1e6:8.1f} us/request')
+            transaction.set_rollback(True)
+        throttle_cache().clear()
+
+    def run(self, scope, users, count):
+        class Ping(APIView):
+            permission_classes = [IsAuthenticated]
+            throttle_scope = scope
+
+            def post(self, request):
+                return Response({'ok': True})
+
+        view = Ping.as_view()
+        factory = APIRequestFactory()
+        started = time.perf_counter()
+        for index in range(count):
+            request = factory.post('/ping/')
+            force_authenticate(request, users[index % len(users)])
+            response = view(request)
+            assert response.status_code == 200, response.status_code
+        return count / (time.perf_counter() - started)
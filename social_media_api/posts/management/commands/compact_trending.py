@@ -0,0 +1,26 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.trending import compact, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Prune decayed rows from the trending score table, or rebuild it from likes and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recompute all scores from recent likes and comments, e.g. after changing TRENDING_HALF_LIFE.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            # Older activity has decayed below TRENDING_MIN_SCORE on its own.
+            half_lives = math.log2(max(settings.TRENDING_WEIGHTS.values()) / settings.TRENDING_MIN_SCORE)
+            since = timezone.now() - timedelta(seconds=settings.TRENDING_HALF_LIFE * max(half_lives, 0))
+            self.stdout.write(f'Rebuilt trending scores for {rebuild(since)} posts.')
+        self.stdout.write(f'Removed {compact()} trending rows.')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Like, Post
+
+
+def count_subquery(model):
+    counts = (
+        model.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute Post.like_count and Post.comment_count from the Like and Comment tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write('No posts to reconcile.')
+            return
+
+        updated = 0
+        # One UPDATE per primary key range keeps each statement's lock short.
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            updated += Post.objects.filter(pk__gte=start, pk__lt=start + batch_size).update(
+                like_count=count_subquery(Like),
+                comment_count=count_subquery(Comment),
+            )
+        self.stdout.write(self.style.SUCCESS(f'Reconciled counters on {updated} posts.'))
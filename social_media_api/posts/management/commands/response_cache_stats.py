@@ -0,0 +1,24 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from social_media_api.response_cache import response_cache, stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counts of the anonymous response cache, when it is shared between processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scopes', nargs='*', default=['posts', 'comments'])
+
+    def handle(self, *args, **options):
+        if isinstance(response_cache(), LocMemCache):
+            # This process has its own empty LocMemCache and would report zeros.
+            raise CommandError(
+                'RESPONSE_CACHE_ALIAS is a per-process LocMemCache; '
+                'read the counts from a server process at /api/posts/response-cache/stats/.'
+            )
+        for scope in options['scopes']:
+            counts = stats(scope)
+            total = counts['hits'] + counts['misses']
+            ratio = counts['hits'] / total if total else 0
+            self.stdout.write(f'{scope:10} {counts["hits"]:8} hits {counts["misses"]:8} misses  {ratio:6.1%} hit ratio')
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_trendingscore'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timelineentry',
+            name='post_created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        # Copied in the database, so existing timelines are never loaded into memory.
+        migrations.RunSQL(
+            'UPDATE posts_timelineentry SET post_created_at = '
+            '(SELECT created_at FROM posts_post WHERE posts_post.id = posts_timelineentry.post_id)',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='timelineentry',
+            name='post_created_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-created_at', '-id'], name='post_pull_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['owner', '-post_created_at', '-post'], name='posts_timel_owner_i_9858ff_idx'),
+        ),
+    ]
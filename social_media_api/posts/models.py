@@ -7,6 +7,25 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in step with F() updates by the like and
+    # comment views. `reconcile_post_counters` repairs any drift.
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # False when the post was not pushed into follower timelines (heavy authors),
+    # so feeds pull it on read instead.
+    fanned_out = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['author', '-created_at', '-id']),
+            # Posts read into feeds on demand instead of being fanned out.
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                condition=models.Q(fanned_out=False),
+                name='post_pull_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -18,6 +37,12 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['post', '-created_at', '-id']),
+        ]
+
     def __str__(self):
         return f'Comment by {self.author} on {self.post}'
 
@@ -30,4 +55,40 @@ class Like(models.Model):
         unique_together = ('user', 'post')
 
     def __str__(self):
-        return f"{self.user.username} likes {self.post.title}"
\ No newline at end of file
+        return f"{self.user.username} likes {self.post.title}"
+
+class TimelineEntry(models.Model):
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    # Copy of post.created_at, so a timeline page is a range read on the index.
+    post_created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('owner', 'post')
+        indexes = [
+            models.Index(fields=['owner', 'author']),
+            models.Index(fields=['owner', '-post_created_at', '-post']),
+        ]
+
+    def __str__(self):
+        return f"{self.post.title} in {self.owner.username}'s timeline"
+
+
+class TrendingScore(models.Model):
+    """
+    Time-decayed activity score of a post, maintained by posts.trending.
+
+    `score` is stored in log space relative to a fixed epoch, so newer activity
+    outweighs older activity without rewriting rows as time passes.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', '-post']),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.3f}'
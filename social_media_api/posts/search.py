@@ -0,0 +1,97 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Post
+
+# Must match the configuration of the generated column in migration 0006.
+SEARCH_CONFIG = 'english'
+
+FTS_TABLE = 'posts_post_fts'
+
+# SQLite only: an external-content FTS5 index over posts_post kept in sync by
+# triggers. SQLite rebuilds tables for many ALTERs, which drops triggers, so
+# this is (re)applied after every migrate rather than once in a migration.
+SQLITE_FTS_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, content, content='posts_post', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, content ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+
+def install_sqlite_search(using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or Post._meta.db_table not in connection.introspection.table_names():
+        # Also skipped while posts is unmigrated, e.g. on a partial migrate.
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{FTS_TABLE}_%'],
+        )
+        installed = cursor.fetchone()[0] == 3
+        for statement in SQLITE_FTS_SQL:
+            cursor.execute(statement)
+        if not installed:
+            # Writes made while the triggers were missing are not indexed.
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def fts5_query(terms):
+    # Quote each word so user input is never parsed as FTS5 syntax.
+    words = re.findall(r'\w+', terms)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+class PostSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter on posts backed by a full-text index.
+
+    PostgreSQL matches `search` against the generated `search_vector` column
+    (GIN indexed) as a web-search style query; SQLite uses the FTS5 table.
+    Matches are annotated with `search_rank`, higher is more relevant.
+    Other databases fall back to SearchFilter's icontains lookups.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        vendor = connections[queryset.db].vendor
+        if vendor == 'postgresql':
+            return self.filter_postgresql(queryset, terms)
+        if vendor == 'sqlite':
+            return self.filter_sqlite(queryset, terms)
+        return super().filter_queryset(request, queryset, view)
+
+    def filter_postgresql(self, queryset, terms):
+        vector = RawSQL(f'{Post._meta.db_table}.search_vector', (), output_field=SearchVectorField())
+        query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            queryset.alias(search_vector=vector)
+            .filter(search_vector=query)
+            .annotate(search_rank=SearchRank(vector, query))
+        )
+
+    def filter_sqlite(self, queryset, terms):
+        match = fts5_query(terms)
+        if not match:
+            return queryset.none()
+        # bm25() is lower-is-better; title is weighted like tsvector weight A over B.
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 2.5, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {Post._meta.db_table}.id',
+            (match,),
+            output_field=FloatField(),
+        )
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,))
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
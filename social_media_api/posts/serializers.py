@@ -1,17 +1,33 @@
 from rest_framework import serializers
+from accounts.serializers import AvatarField
+from social_media_api.sparse_fields import SparseFieldsetMixin
 from .models import Post, Comment
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
+    author_avatar = AvatarField(source='author.profile_picture_renditions')
 
     class Meta:
         model = Post
-        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at']
+        fields = ['id', 'author', 'author_avatar', 'title', 'content', 'created_at', 'updated_at', 'like_count', 'comment_count']
+        read_only_fields = ['like_count', 'comment_count']
+        select_related = ['author']
+        truncate_fields = ['content']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
+    author_avatar = AvatarField(source='author.profile_picture_renditions')
     post = serializers.PrimaryKeyRelatedField(queryset=Post.objects.all())
 
     class Meta:
         model = Comment
-        fields = ['id', 'post', 'author', 'content', 'created_at', 'updated_at']
\ No newline at end of file
+        fields = ['id', 'post', 'author', 'author_avatar', 'content', 'created_at', 'updated_at']
+        select_related = ['author']
+        truncate_fields = ['content']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None and 'post' in fields:
+            # Moving a comment would leave both posts' counters and scores wrong.
+            fields['post'].read_only = True
+        return fields
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from social_media_api.response_cache import invalidate
+from .models import Comment, Like, Post
+
+
+def invalidate_scopes(*scopes):
+    # Now for reads later in this transaction, and again after commit in case a
+    # concurrent request cached the old rows in between.
+    invalidate(*scopes)
+    transaction.on_commit(lambda: invalidate(*scopes))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_posts(sender, **kwargs):
+    invalidate_scopes('posts')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, **kwargs):
+    # Post pages show comment_count.
+    invalidate_scopes('comments', 'posts')
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_likes(sender, **kwargs):
+    invalidate_scopes('posts')
@@ -1,3 +1,778 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from notifications.models import Notification
+from social_media_api.response_cache import stats
+from social_media_api.testing import QueryBudgetMixin
+from .like_buffer import like_buffer
+from .models import Comment, Like, Post, TimelineEntry, TrendingScore
+from .timeline import pulled_author_ids
+from .trending import compact, record_activity
+
+User = get_user_model()
+
+
+class FeedTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.reader.following.add(self.author)
+
+    def create_post(self, title):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(reverse('post-list'), {'title': title, 'content': 'body'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Post.objects.get(pk=response.data['id'])
+
+    def feed_titles(self):
+        self.client.force_authenticate(self.reader)
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        post = self.create_post('Hello')
+        self.assertTrue(post.fanned_out)
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.reader, post=post).exists())
+        self.assertEqual(self.feed_titles(), ['Hello'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_is_read_on_demand(self):
+        post = self.create_post('Popular')
+        self.assertFalse(post.fanned_out)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), ['Popular'])
+
+    def test_pages_merge_timeline_and_pulled_posts(self):
+        titles = []
+        for index in range(5):
+            with override_settings(TIMELINE_FANOUT_LIMIT=0 if index % 2 else 1000):
+                titles.append(self.create_post(f'Post {index}').title)
+        # Ties on the timestamp are broken by id across both sources.
+        now = timezone.now()
+        Post.objects.update(created_at=now)
+        TimelineEntry.objects.update(post_created_at=now)
+        self.client.force_authenticate(self.reader)
+        seen, url = [], reverse('feed') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen += [post['title'] for post in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, titles[::-1])
+
+    def test_backfill_fans_out_existing_posts(self):
+        # Written before timelines existed: neither fanned out nor in any timeline.
+        Post.objects.create(author=self.author, title='Old', content='body')
+        heavy = User.objects.create_user(username='heavy', password='pass12345')
+        self.reader.following.add(heavy)
+        Post.objects.create(author=heavy, title='Heavy', content='body')
+        with override_settings(TIMELINE_FANOUT_LIMIT=1):
+            User.objects.create_user(username='fan', password='pass12345').following.add(heavy)
+            call_command('backfill_timelines', stdout=StringIO())
+        self.assertEqual(pulled_author_ids(self.reader), [heavy.pk])
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.reader, post__title='Old').exists())
+        self.assertEqual(self.feed_titles(), ['Heavy', 'Old'])
+
+    def test_deleted_post_leaves_the_timeline(self):
+        post = self.create_post('Gone')
+        self.client.delete(reverse('post-detail', kwargs={'pk': post.pk}))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), [])
+
+    def test_unfollow_removes_author_from_timeline(self):
+        self.create_post('Hello')
+        self.client.force_authenticate(self.reader)
+        self.client.post(reverse('unfollow-user', kwargs={'user_id': self.author.pk}))
+        self.assertEqual(self.feed_titles(), [])
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        for i in range(5):
+            Post.objects.create(author=self.author, title=f'Post {i}', content='body')
+        # Identical timestamps must still paginate without gaps or repeats.
+        Post.objects.update(created_at=Post.objects.first().created_at)
+
+    def test_walks_every_post_once(self):
+        seen = []
+        url = reverse('post-list') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen += [post['id'] for post in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, sorted(Post.objects.values_list('id', flat=True), reverse=True))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('post-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    # Queries per list page, independent of how many rows are on it.
+    budgets = {
+        'post-list': 1,
+        'comment-list': 1,
+        # Followed authors with pending posts, then the page.
+        'feed': 2,
+    }
+
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        for i in range(5):
+            author = User.objects.create_user(username=f'author{i}', password='pass12345')
+            self.reader.following.add(author)
+            post = Post.objects.create(author=author, title=f'Post {i}', content='body')
+            Comment.objects.create(post=post, author=author, content='comment')
+        self.client.force_authenticate(self.reader)
+
+    def test_list_endpoints_stay_within_budget(self):
+        for name, budget in self.budgets.items():
+            with self.subTest(endpoint=name), self.assertQueryBudget(budget):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), 5)
+
+
+@override_settings(NOTIFICATIONS_DISPATCH_SYNC=True)
+class CounterTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fan = User.objects.create_user(username='fan', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Hot', content='body')
+        self.client.force_authenticate(self.fan)
+
+    def test_like_and_unlike_update_like_count(self):
+        self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        self.client.post(reverse('unlike-post', kwargs={'pk': self.post.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_racing_unlike_decrements_once(self):
+        # Read by this unlike, then deleted by a concurrent one before this one deletes.
+        stale = Like.objects.create(user=self.fan, post=self.post)
+        Like.objects.filter(pk=stale.pk).delete()
+        Post.objects.filter(pk=self.post.pk).update(like_count=1)
+        real_filter = Like.objects.filter
+        reads = iter([mock.Mock(first=lambda: stale)])
+
+        def like_filter(*args, **kwargs):
+            return next(reads, None) or real_filter(*args, **kwargs)
+
+        with mock.patch('posts.views.Like.objects.filter', side_effect=like_filter):
+            response = self.client.post(reverse('unlike-post', kwargs={'pk': self.post.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_like_does_not_load_the_author(self):
+        record_activity(self.post.pk, 'comment')
+        ContentType.objects.get_for_model(Post)
+        # Post, like insert, counter and score updates, then the notification write.
+        with self.assertQueryBudget(11) as queries:
+            response = self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse([query for query in queries.captured_queries if 'accounts_customuser' in query['sql']])
+        self.assertTrue(Notification.objects.filter(recipient=self.author, actor=self.fan).exists())
+
+    def test_comments_update_comment_count(self):
+        response = self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'Nice'}, format='json')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        self.client.delete(reverse('comment-detail', kwargs={'pk': response.data['id']}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_comments_cannot_move_to_another_post(self):
+        other = Post.objects.create(author=self.author, title='Other', content='body')
+        response = self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'Nice'}, format='json')
+        url = reverse('comment-detail', kwargs={'pk': response.data['id']})
+        response = self.client.patch(url, {'post': other.pk, 'content': 'Edited'}, format='json')
+        self.assertEqual((response.data['post'], response.data['content']), (self.post.pk, 'Edited'))
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.post.comment_count, other.comment_count), (1, 0))
+
+    def test_counts_are_serialized(self):
+        response = self.client.get(reverse('post-detail', kwargs={'pk': self.post.pk}))
+        self.assertEqual(response.data['like_count'], 0)
+        self.assertEqual(response.data['comment_count'], 0)
+
+    def test_reconcile_repairs_drift(self):
+        Like.objects.create(user=self.fan, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+        call_command('reconcile_post_counters', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (1, 0))
+
+
+@override_settings(
+    LIKE_BUFFER_ENABLED=True, LIKE_BUFFER_MAX_SIZE=100, LIKE_BUFFER_FLUSH_INTERVAL=3600,
+    NOTIFICATIONS_DISPATCH_SYNC=True,
+)
+class LikeBufferTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Viral', content='body')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(3)]
+        self.addCleanup(like_buffer.flush)
+
+    def like(self, user, view='like-post'):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse(view, kwargs={'pk': self.post.pk}))
+
+    def test_likes_are_written_on_flush(self):
+        for fan in self.fans:
+            self.assertEqual(self.like(fan).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.like(self.fans[0]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Like.objects.exists())
+
+        self.assertEqual(like_buffer.flush(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 3)
+        self.assertEqual(Notification.objects.get(recipient=self.author).actor_count, 3)
+
+    def test_unlike_cancels_a_pending_like(self):
+        self.like(self.fans[0])
+        self.assertEqual(self.like(self.fans[0], 'unlike-post').status_code, status.HTTP_200_OK)
+        self.assertEqual(like_buffer.flush(), 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_existing_likes_are_rejected(self):
+        Like.objects.create(user=self.fans[0], post=self.post)
+        self.assertEqual(self.like(self.fans[0]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(like_buffer), 0)
+
+    def test_flush_skips_existing_likes(self):
+        self.like(self.fans[0])
+        Like.objects.create(user=self.fans[0], post=self.post)
+        self.assertEqual(like_buffer.flush(), 0)
+
+    def test_likes_written_concurrently_are_not_counted(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        # Another worker's buffer commits fan0's like after this flush read the table.
+        Like.objects.create(user=self.fans[0], post=self.post)
+        with mock.patch('posts.like_buffer.Like.objects.filter', return_value=Like.objects.none()):
+            self.assertEqual(like_buffer.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, Like.objects.count()), (1, 2))
+        self.assertEqual(Notification.objects.get(recipient=self.author).actor, self.fans[1])
+
+    @override_settings(LIKE_BUFFER_MAX_SIZE=2)
+    def test_size_threshold_flushes_in_the_background(self):
+        with mock.patch.object(like_buffer, '_flush_in_background') as flush_in_background:
+            self.like(self.fans[0])
+            self.like(self.fans[1])
+        flush_in_background.assert_called_once_with()
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(like_buffer.flush(), 2)
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+
+    def create_post(self, title, content='body'):
+        return Post.objects.create(author=self.author, title=title, content=content)
+
+    def search(self, terms, **params):
+        response = self.client.get(reverse('post-list'), {'search': terms, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def titles(self, response):
+        return [post['title'] for post in response.data['results']]
+
+    def test_matches_stemmed_words(self):
+        self.create_post('Morning run', 'I was running by the river')
+        self.create_post('Lunch', 'Soup again')
+        self.assertEqual(self.titles(self.search('runs')), ['Morning run'])
+
+    def test_title_matches_rank_first(self):
+        body = self.create_post('Notes', 'Garden garden and more about the garden')
+        title = self.create_post('Garden', 'Tomatoes')
+        Post.objects.filter(pk=body.pk).update(created_at=title.created_at)
+        self.assertEqual(self.titles(self.search('garden'))[0], 'Garden')
+
+    def test_ranked_results_paginate(self):
+        for index in range(5):
+            self.create_post(f'Chess {index}', 'chess ' * (index + 1))
+        self.create_post('Unrelated')
+        first = self.search('chess', page_size=3)
+        self.assertEqual(len(first.data['results']), 3)
+        second = self.client.get(first.data['next'])
+        seen = self.titles(first) + self.titles(second)
+        self.assertEqual(sorted(seen), [f'Chess {index}' for index in range(5)])
+        self.assertIsNone(second.data['next'])
+
+    def test_index_follows_updates_and_deletes(self):
+        post = self.create_post('Draft', 'about cats')
+        post.content = 'about dogs'
+        post.save()
+        self.assertEqual(self.titles(self.search('cats')), [])
+        self.assertEqual(self.titles(self.search('dogs')), ['Draft'])
+        post.delete()
+        self.assertEqual(self.titles(self.search('dogs')), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.create_post('Quotes', 'she said "hello"')
+        self.assertEqual(self.titles(self.search('"hello* (')), ['Quotes'])
+        self.assertEqual(self.titles(self.search('***')), [])
+
+    def test_without_search_lists_by_recency(self):
+        self.create_post('Old')
+        self.create_post('New')
+        response = self.client.get(reverse('post-list'))
+        self.assertEqual(self.titles(response), ['New', 'Old'])
+
+
+@override_settings(NOTIFICATIONS_DISPATCH_SYNC=True)
+class TrendingTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fans = [User.objects.create_user(username=f'fan{index}', password='pass12345') for index in range(3)]
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {index}', content='body') for index in range(3)]
+
+    def like(self, user, post):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('like-post', args=[post.pk]))
+
+    def trending_titles(self):
+        response = self.client.get(reverse('trending-posts'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']]
+
+    def test_ranks_by_activity(self):
+        for fan in self.fans:
+            self.like(fan, self.posts[1])
+        self.like(self.fans[0], self.posts[2])
+        self.assertEqual(self.trending_titles(), ['Post 1', 'Post 2'])
+
+        self.client.force_authenticate(self.fans[0])
+        self.client.post(reverse('comment-list'), {'post': self.posts[2].pk, 'content': 'nice'}, format='json')
+        self.assertEqual(self.trending_titles(), ['Post 2', 'Post 1'])
+
+    def test_older_activity_decays(self):
+        now = timezone.now()
+        half_life = timedelta(seconds=settings.TRENDING_HALF_LIFE)
+        # Three likes two half-lives ago are worth less than one like now.
+        record_activity(self.posts[0].pk, 'like', count=3, when=now - 2 * half_life)
+        record_activity(self.posts[1].pk, 'like', when=now)
+        self.assertEqual(self.trending_titles(), ['Post 1', 'Post 0'])
+
+    def test_unlike_retracts_score(self):
+        self.like(self.fans[0], self.posts[0])
+        self.like(self.fans[1], self.posts[0])
+        self.like(self.fans[0], self.posts[1])
+        self.client.force_authenticate(self.fans[1])
+        self.client.post(reverse('unlike-post', args=[self.posts[0].pk]))
+        single = TrendingScore.objects.get(post=self.posts[1]).score
+        self.assertAlmostEqual(TrendingScore.objects.get(post=self.posts[0]).score, single, delta=1e-3)
+
+        self.client.force_authenticate(self.fans[0])
+        self.client.post(reverse('unlike-post', args=[self.posts[1].pk]))
+        call_command('compact_trending', stdout=StringIO())
+        self.assertEqual(self.trending_titles(), ['Post 0'])
+
+    def test_compaction_caps_rows(self):
+        for post in self.posts:
+            record_activity(post.pk, 'like')
+        record_activity(self.posts[0].pk, 'like', when=timezone.now() - timedelta(days=30))
+        with self.settings(TRENDING_MAX_ROWS=2):
+            self.assertEqual(compact(), 1)
+        self.assertEqual(TrendingScore.objects.count(), 2)
+
+    def test_rebuild_matches_incremental_scores(self):
+        self.like(self.fans[0], self.posts[0])
+        self.like(self.fans[1], self.posts[0])
+        self.client.force_authenticate(self.fans[2])
+        self.client.post(reverse('comment-list'), {'post': self.posts[1].pk, 'content': 'hi'}, format='json')
+        incremental = dict(TrendingScore.objects.values_list('post_id', 'score'))
+        call_command('compact_trending', rebuild=True, stdout=StringIO())
+        rebuilt = dict(TrendingScore.objects.values_list('post_id', 'score'))
+        self.assertEqual(set(rebuilt), set(incremental))
+        for post_id, score in rebuilt.items():
+            self.assertAlmostEqual(score, incremental[post_id], places=6)
+
+    def test_reads_in_one_query(self):
+        for fan in self.fans:
+            self.like(fan, self.posts[fan.pk % 3])
+        with self.assertNumQueries(1):
+            self.client.get(reverse('trending-posts'))
+
+
+@override_settings(NOTIFICATIONS_DISPATCH_SYNC=True)
+class ConditionalRequestTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.reader.following.add(self.author)
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {index}', content='body') for index in range(3)]
+
+    def assertRevalidates(self, url, budget=1):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', first)
+        with self.assertQueryBudget(budget):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.content, b'')
+        return first
+
+    def test_post_list_and_detail(self):
+        self.assertRevalidates(reverse('post-list'))
+        self.assertRevalidates(reverse('post-list') + '?search=body')
+        self.assertRevalidates(reverse('post-detail', args=[self.posts[0].pk]))
+
+    def test_comment_list_and_feed(self):
+        Comment.objects.create(post=self.posts[0], author=self.reader, content='hi')
+        self.assertRevalidates(reverse('comment-list'))
+        self.client.force_authenticate(self.reader)
+        self.assertRevalidates(reverse('feed'), budget=2)
+
+    def test_edits_and_counters_change_the_etag(self):
+        url = reverse('post-list')
+        etag = self.assertRevalidates(url)['ETag']
+
+        self.client.force_authenticate(self.reader)
+        self.client.post(reverse('like-post', args=[self.posts[1].pk]))
+        liked = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(liked.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(self.author)
+        self.client.patch(reverse('post-detail', args=[self.posts[2].pk]), {'title': 'Edited'}, format='json')
+        edited = self.client.get(url, HTTP_IF_NONE_MATCH=liked['ETag'])
+        self.assertEqual(edited.status_code, status.HTTP_200_OK)
+        self.assertEqual(edited.data['results'][0]['title'], 'Edited')
+
+    def test_pages_have_their_own_etag(self):
+        first = self.client.get(reverse('post-list'), {'page_size': 2})
+        second = self.client.get(first.data['next'], HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_likes_and_deletes_are_never_answered_with_304(self):
+        # Neither touches updated_at, so only the ETag can tell.
+        detail = reverse('post-detail', args=[self.posts[0].pk])
+        first = self.client.get(detail)
+        self.assertNotIn('Last-Modified', first)
+        self.client.force_authenticate(self.reader)
+        self.client.post(reverse('like-post', args=[self.posts[0].pk]))
+        since = http_date()
+        liked = self.client.get(detail, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual((liked.status_code, liked.data['like_count']), (status.HTTP_200_OK, 1))
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=first['ETag']).status_code, status.HTTP_200_OK)
+
+        listed = self.client.get(reverse('post-list'))
+        self.posts[1].delete()
+        response = self.client.get(reverse('post-list'), HTTP_IF_NONE_MATCH=listed['ETag'], HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_detail_loads_the_post_once(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse('post-detail', args=[self.posts[0].pk]))
+        self.assertEqual(response.data['title'], 'Post 0')
+
+
+class SparseFieldsetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.reader.following.add(self.author)
+        for index in range(3):
+            Post.objects.create(author=self.author, title=f'Post {index}', content='a long body of text')
+
+    def test_fields_limit_the_payload_and_the_columns(self):
+        with self.assertQueryBudget(1) as queries:
+            response = self.client.get(reverse('post-list'), {'fields': 'id,title'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('"content"', sql)
+        self.assertNotIn('accounts_customuser', sql)
+
+    def test_exclude_and_related_fields(self):
+        response = self.client.get(reverse('post-list'), {'exclude': 'content,author_avatar'})
+        row = response.data['results'][0]
+        self.assertNotIn('content', row)
+        self.assertEqual(row['author'], 'author')
+        self.client.force_authenticate(self.reader)
+        with self.assertQueryBudget(2):
+            response = self.client.get(reverse('feed'), {'fields': 'title,author', 'page_size': 2})
+        self.assertEqual(response.data['results'][0], {'title': 'Post 2', 'author': 'author'})
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['title'] for row in response.data['results']], ['Post 0'])
+
+    def test_truncate(self):
+        response = self.client.get(reverse('post-list'), {'truncate': 6})
+        self.assertEqual(response.data['results'][0]['content'], 'a long…')
+        self.assertEqual(response.data['results'][0]['title'], 'Post 2')
+
+    def test_invalid_parameters_are_rejected(self):
+        response = self.client.get(reverse('post-list'), {'fields': 'title,password', 'truncate': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+        self.assertIn('truncate', response.data)
+
+    def test_fieldsets_have_their_own_etag(self):
+        full = self.client.get(reverse('post-list'))
+        sparse = self.client.get(reverse('post-list'), {'fields': 'id'}, HTTP_IF_NONE_MATCH=full['ETag'])
+        self.assertEqual(sparse.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(sparse['ETag'], full['ETag'])
+
+    def test_writes_ignore_fieldsets(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(reverse('post-list') + '?fields=id', {'title': 'New', 'content': 'body'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['content'], 'body')
+
+
+@override_settings(NOTIFICATIONS_DISPATCH_SYNC=True)
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='First', content='body')
+
+    def titles(self, url=None):
+        response = self.client.get(url or reverse('post-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.json()['results']]
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        first = self.client.get(reverse('post-list'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('post-list'))
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(reverse('post-list'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(stats('posts'), {'hits': 2, 'misses': 1})
+
+    def test_query_parameters_are_part_of_the_key(self):
+        Post.objects.create(author=self.author, title='Second', content='body')
+        self.assertEqual(self.titles(), ['Second', 'First'])
+        self.assertEqual(self.titles(reverse('post-list') + '?page_size=1'), ['Second'])
+        self.assertEqual(stats('posts')['misses'], 2)
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.force_authenticate(self.author)
+        self.titles()
+        self.titles()
+        self.assertEqual(stats('posts'), {'hits': 0, 'misses': 0})
+
+    def test_writes_invalidate_their_scopes(self):
+        self.titles()
+        self.titles(reverse('comment-list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, title='Second', content='body')
+        self.assertEqual(self.titles(), ['Second', 'First'])
+
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'hi'}, format='json')
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse('post-list'))
+        self.assertEqual(response.json()['results'][1]['comment_count'], 1)
+        self.assertEqual(len(self.client.get(reverse('comment-list')).json()['results']), 1)
+
+    def test_likes_invalidate_posts(self):
+        self.titles()
+        fan = User.objects.create_user(username='fan', password='pass12345')
+        self.client.force_authenticate(fan)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('like-post', args=[self.post.pk]))
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('post-list')).json()['results'][0]['like_count'], 1)
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.titles()
+        self.titles()
+        url = reverse('response-cache-stats')
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='pass12345', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.data['posts'], {'hits': 1, 'misses': 1})
+
+    def test_stats_command_needs_a_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, 'per-process LocMemCache'):
+            call_command('response_cache_stats', stdout=StringIO())
+        shared = {
+            'default': settings.CACHES['default'],
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()},
+        }
+        with self.settings(CACHES=shared, RESPONSE_CACHE_ALIAS='shared'):
+            self.addCleanup(shutil.rmtree, shared['shared']['LOCATION'])
+            self.titles()
+            self.titles()
+            out = StringIO()
+            call_command('response_cache_stats', 'posts', stdout=out)
+        self.assertIn('1 hits', out.getvalue())
+        self.assertIn('50.0% hit ratio', out.getvalue())
+
+
+@override_settings(NOTIFICATIONS_DISPATCH_SYNC=True)
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fan = User.objects.create_user(username='fan', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='First', content='body')
+
+    def test_retried_like_replays_the_first_response(self):
+        self.client.force_authenticate(self.fan)
+        url = reverse('like-post', args=[self.post.pk])
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='like-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(0):
+            retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY='like-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Like.objects.count(), 1)
+
+        # Without a key the write path runs again.
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retried_create_makes_one_post(self):
+        self.client.force_authenticate(self.author)
+        data = {'title': 'Retried', 'content': 'body'}
+        first = self.client.post(reverse('post-list'), data, format='json', HTTP_IDEMPOTENCY_KEY='post-1')
+        retry = self.client.post(reverse('post-list'), data, format='json', HTTP_IDEMPOTENCY_KEY='post-1')
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Post.objects.filter(title='Retried').count(), 1)
+
+        other = self.client.post(
+            reverse('post-list'), {'title': 'Other', 'content': 'body'}, format='json', HTTP_IDEMPOTENCY_KEY='post-1',
+        )
+        self.assertEqual(other.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_keys_are_scoped_per_user(self):
+        url = reverse('comment-list')
+        data = {'post': self.post.pk, 'content': 'hi'}
+        for user in (self.author, self.fan):
+            self.client.force_authenticate(user)
+            response = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='comment-1')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_key_in_flight_is_a_conflict(self):
+        self.client.force_authenticate(self.fan)
+        url = reverse('like-post', args=[self.post.pk])
+        with mock.patch('posts.views.Like.objects.create', side_effect=self.retry_during_first(url)):
+            self.client.post(url, HTTP_IDEMPOTENCY_KEY='like-2')
+        self.assertEqual(self.conflict.status_code, status.HTTP_409_CONFLICT)
+
+    def retry_during_first(self, url):
+        create = Like.objects.create
+
+        def create_after_retry(**kwargs):
+            self.conflict = self.client.post(url, HTTP_IDEMPOTENCY_KEY='like-2')
+            return create(**kwargs)
+        return create_after_retry
+
+    def test_server_errors_release_the_key(self):
+        self.client.force_authenticate(self.fan)
+        self.client.raise_request_exception = False
+        url = reverse('like-post', args=[self.post.pk])
+        with mock.patch('posts.views.Like.objects.create', side_effect=RuntimeError):
+            self.assertEqual(self.client.post(url, HTTP_IDEMPOTENCY_KEY='like-3').status_code, 500)
+        self.assertEqual(self.client.post(url, HTTP_IDEMPOTENCY_KEY='like-3').status_code, status.HTTP_201_CREATED)
+
+
+class BatchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.reader.following.add(self.author)
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {index}', content='body') for index in range(2)]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(owner=self.reader, post=post, author=self.author, post_created_at=post.created_at)
+                for post in self.posts
+            ]
+        )
+
+    def batch(self, paths, **options):
+        return self.client.post(reverse('batch'), {'requests': [{'path': path} for path in paths], **options}, format='json')
+
+    def test_combines_sub_responses_in_order(self):
+        self.client.force_authenticate(self.reader)
+        paths = [
+            reverse('feed'),
+            reverse('notifications:unread-notifications'),
+            reverse('post-detail', args=[self.posts[0].pk]) + '?format=json',
+            reverse('post-detail', args=[0]),
+            '/api/nowhere/',
+        ]
+        response = self.batch(paths)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['responses']
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 404, 404])
+        self.assertEqual(results[0]['body'], self.client.get(paths[0]).json())
+        self.assertEqual(results[2]['body']['title'], 'Post 0')
+
+    def test_sub_requests_share_the_batch_user(self):
+        response = self.batch([reverse('feed'), reverse('post-list')])
+        self.assertEqual([result['status'] for result in response.json()['responses']], [401, 200])
+
+    def test_async_endpoints_are_not_dispatched(self):
+        self.client.force_authenticate(self.reader)
+        result, = self.batch([reverse('notifications:notification-stream')]).json()['responses']
+        self.assertEqual(result, {'status': 400, 'body': {'detail': 'Async endpoints cannot be batched.'}})
+
+    def test_rejects_invalid_batches(self):
+        self.client.force_authenticate(self.reader)
+        self.assertEqual(self.batch([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch(['/api/batch/']).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch(['/admin/']).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            reverse('batch'), {'requests': [{'method': 'POST', 'path': reverse('post-list')}]}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(BATCH_MAX_REQUESTS=1):
+            self.assertEqual(self.batch([reverse('feed')] * 2).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConcurrentBatchTests(TransactionTestCase):
+    def test_concurrent_batch_matches_sequential(self):
+        author = User.objects.create_user(username='author', password='pass12345')
+        for index in range(3):
+            Post.objects.create(author=author, title=f'Post {index}', content='body')
+        client = APIClient()
+        client.force_authenticate(author)
+        requests = [{'path': reverse('post-detail', args=[post.pk])} for post in Post.objects.all()]
+        sequential = client.post(reverse('batch'), {'requests': requests}, format='json').json()
+        concurrent = client.post(reverse('batch'), {'requests': requests, 'concurrent': True}, format='json').json()
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual([result['status'] for result in concurrent['responses']], [200, 200, 200])
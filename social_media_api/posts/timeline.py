@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from accounts.models import Follow
+from .models import Post, TimelineEntry
+
+
+def fan_out_post(post):
+    """
+    Push a new post into its author's followers' timelines.
+    Authors above TIMELINE_FANOUT_LIMIT are skipped and read at feed time.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if post.author.follower_count > limit:
+        return False
+    follower_ids = list(
+        Follow.objects.filter(followee=post.author_id).values_list('follower_id', flat=True)[:limit + 1]
+    )
+    if len(follower_ids) > limit:
+        return False
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(owner_id=pk, post=post, author_id=post.author_id, post_created_at=post.created_at)
+            for pk in follower_ids
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    Post.objects.filter(pk=post.pk).update(fanned_out=True)
+    post.fanned_out = True
+    return True
+
+
+def backfill_timeline(user, author_ids):
+    """
+    Copy the most recent fanned-out posts of newly followed authors into the
+    user's timeline.
+    """
+    recent = (
+        Post.objects.filter(author_id__in=author_ids, fanned_out=True)
+        .order_by('-created_at')
+        .values_list('pk', 'author_id', 'created_at')[:settings.TIMELINE_BACKFILL_SIZE]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(owner=user, post_id=pk, author_id=author_id, post_created_at=created_at)
+            for pk, author_id, created_at in recent
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_pending_posts():
+    """
+    Move authors with posts that were never fanned out, such as posts written
+    before timelines existed, off pull-on-read where their follower count
+    allows it. Their TIMELINE_BACKFILL_SIZE most recent posts are copied into
+    each follower's timeline, as on a new follow, and all their pending posts
+    are marked fanned out. Returns the number of authors moved.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    author_ids = Post.objects.filter(fanned_out=False).order_by().values_list('author_id', flat=True).distinct()
+    moved = 0
+    for author_id in list(author_ids):
+        follower_ids = list(
+            Follow.objects.filter(followee=author_id).values_list('follower_id', flat=True)[:limit + 1]
+        )
+        if len(follower_ids) > limit:
+            continue
+        recent = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by('-created_at', '-id')
+            .values_list('pk', 'created_at')[:settings.TIMELINE_BACKFILL_SIZE]
+        )
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(
+                [
+                    TimelineEntry(owner_id=owner_id, post_id=pk, author_id=author_id, post_created_at=created_at)
+                    for owner_id in follower_ids
+                    for pk, created_at in recent
+                ],
+                batch_size=500,
+                ignore_conflicts=True,
+            )
+            Post.objects.filter(author_id=author_id, fanned_out=False).update(fanned_out=True)
+        moved += 1
+    return moved
+
+
+def remove_authors_from_timeline(user, author_ids):
+    TimelineEntry.objects.filter(owner=user, author_id__in=author_ids).delete()
+
+
+def pulled_author_ids(user):
+    """Followed authors with posts that were not fanned out, read into feeds on demand."""
+    pending = Post.objects.filter(author=OuterRef('followee'), fanned_out=False)
+    return list(
+        Follow.objects.filter(follower=user).filter(Exists(pending)).values_list('followee_id', flat=True)
+    )
+
+
+def before(created_at_field, id_field, position):
+    # (created_at, id) < position, as in KeysetPagination.
+    if position is None:
+        return Q()
+    created_at, pk = position
+    return Q(**{f'{created_at_field}__lt': created_at}) | Q(**{created_at_field: created_at, f'{id_field}__lt': pk})
+
+
+def home_timeline(user, position=None, limit=None, author_ids=None):
+    """
+    Posts pushed into the user's timeline, plus posts from followed authors
+    that were not fanned out.
+
+    Candidates are the next `limit` timeline entries after `position`, read in
+    order from the (owner, -post_created_at, -post) index, and the next
+    `limit` pending posts of each pulled author. The caller orders and slices
+    the merged candidates.
+    """
+    if author_ids is None:
+        author_ids = pulled_author_ids(user)
+    entries = (
+        TimelineEntry.objects.filter(before('post_created_at', 'post_id', position), owner=user)
+        .order_by('-post_created_at', '-post_id')
+        .values('post_id')[:limit]
+    )
+    candidates = Q(pk__in=entries)
+    for author_id in author_ids:
+        pending = (
+            Post.objects.filter(before('created_at', 'id', position), author_id=author_id, fanned_out=False)
+            .order_by('-created_at', '-id')
+            .values('pk')[:limit]
+        )
+        candidates |= Q(pk__in=pending)
+    return Post.objects.filter(candidates).order_by('-created_at', '-id')
@@ -0,0 +1,85 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import Comment, Like, TrendingScore
+
+# Scores are ln(sum(weight * e^((t - EPOCH) / tau))) over a post's activity.
+# Every post's real score decays by the same factor over time, so ranking by
+# the stored value ranks by decayed score and rows never need rescaling.
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+# Lower bound for 1 - e^(b - a) when subtracting, so undoing a post's only
+# activity leaves a negligible score instead of taking ln(0).
+SUBTRACT_FLOOR = 1e-12
+
+
+def log_weight(weight, when):
+    tau = settings.TRENDING_HALF_LIFE / math.log(2)
+    return math.log(weight) + (when - EPOCH).total_seconds() / tau
+
+
+def log_add(a, b):
+    return max(a, b) + math.log1p(math.exp(-abs(a - b)))
+
+
+def record_activity(post_id, kind, count=1, when=None):
+    """Add `count` events of `kind` (a TRENDING_WEIGHTS key) to a post's score."""
+    value = Value(log_weight(settings.TRENDING_WEIGHTS[kind] * count, when or timezone.now()), FloatField())
+    # log(e^a + e^b) = max(a, b) + log(1 + e^-|a - b|), evaluated in the UPDATE.
+    added = Greatest(F('score'), value) + Ln(Value(1.0) + Exp(-Abs(F('score') - value)))
+    if TrendingScore.objects.filter(post_id=post_id).update(score=added):
+        return
+    try:
+        with transaction.atomic():
+            TrendingScore.objects.create(post_id=post_id, score=value.value)
+    except IntegrityError:
+        # Created concurrently since the UPDATE.
+        TrendingScore.objects.filter(post_id=post_id).update(score=added)
+
+
+def retract_activity(post_id, kind, when):
+    """Remove one event of `kind` that was recorded at `when`."""
+    value = Value(log_weight(settings.TRENDING_WEIGHTS[kind], when), FloatField())
+    # log(e^a - e^b) = a + log(1 - e^(b - a))
+    remaining = Greatest(Value(1.0) - Exp(value - F('score')), Value(SUBTRACT_FLOOR))
+    TrendingScore.objects.filter(post_id=post_id).update(score=F('score') + Ln(remaining))
+
+
+def compact(now=None):
+    """
+    Drop rows whose decayed score fell below TRENDING_MIN_SCORE, then keep at
+    most TRENDING_MAX_ROWS. Returns the number of rows deleted.
+    """
+    cutoff = log_weight(settings.TRENDING_MIN_SCORE, now or timezone.now())
+    deleted, _ = TrendingScore.objects.filter(score__lt=cutoff).delete()
+    overflow = (
+        TrendingScore.objects.order_by('-score', '-post')
+        .values_list('score', flat=True)[settings.TRENDING_MAX_ROWS:settings.TRENDING_MAX_ROWS + 1]
+    )
+    if overflow:
+        extra, _ = TrendingScore.objects.filter(score__lte=overflow[0]).delete()
+        deleted += extra
+    return deleted
+
+
+def rebuild(since):
+    """Recompute every score from likes and comments created after `since`."""
+    scores = defaultdict(lambda: -math.inf)
+    for model, kind in ((Like, 'like'), (Comment, 'comment')):
+        rows = model.objects.filter(created_at__gte=since).values_list('post_id', 'created_at')
+        for post_id, created_at in rows.iterator(chunk_size=2000):
+            scores[post_id] = log_add(scores[post_id], log_weight(settings.TRENDING_WEIGHTS[kind], created_at))
+    with transaction.atomic():
+        TrendingScore.objects.all().delete()
+        TrendingScore.objects.bulk_create(
+            [TrendingScore(post_id=post_id, score=score) for post_id, score in scores.items()],
+            batch_size=1000,
+        )
+    return len(scores)
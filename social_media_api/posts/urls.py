@@ -1,14 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet, FeedView, LikePostView, UnlikePostView
+from .views import (
+    PostViewSet, CommentViewSet, FeedView, TrendingPostsView, LikePostView, UnlikePostView, ResponseCacheStatsView,
+)
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet)
 router.register(r'comments', CommentViewSet)
 
 urlpatterns = [
+    # Before the router so 'trending' is not taken for a post pk.
+    path('posts/trending/', TrendingPostsView.as_view(), name='trending-posts'),
     path('', include(router.urls)),
     path('feed/', FeedView.as_view(), name='feed'),
     path('posts/<int:pk>/like/', LikePostView.as_view(), name='like-post'),
     path('posts/<int:pk>/unlike/', UnlikePostView.as_view(), name='unlike-post'),
+    path('response-cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
 ]
\ No newline at end of file
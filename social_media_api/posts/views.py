@@ -1,8 +1,24 @@
-from rest_framework import viewsets, permissions, filters, generics, status
+from functools import cached_property
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from rest_framework import viewsets, permissions, generics, status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from .models import Post, Comment, Like
+from .like_buffer import like_buffer
+from .search import PostSearchFilter
 from .serializers import PostSerializer, CommentSerializer
-from notifications.models import Notification
+from .timeline import fan_out_post, home_timeline, pulled_author_ids
+from .trending import record_activity, retract_activity
+from notifications.dispatch import notify
+from social_media_api.conditional import ConditionalGetMixin
+from social_media_api.eager_loading import EagerLoadingMixin
+from social_media_api.idempotency import IdempotencyKeyMixin
+from social_media_api.pagination import KeysetPagination, SearchRankKeysetPagination, TrendingKeysetPagination
+from social_media_api.response_cache import AnonymousResponseCacheMixin, stats
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -16,58 +32,134 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         # Write permissions only to the owner
         return obj.author == request.user
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(IdempotencyKeyMixin, AnonymousResponseCacheMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
-    filter_backends = [filters.SearchFilter]
+    pagination_class = SearchRankKeysetPagination
+    filter_backends = [PostSearchFilter]
     search_fields = ['title', 'content']
+    # Counters are updated without touching updated_at.
+    conditional_fields = ('id', 'updated_at', 'like_count', 'comment_count')
+    response_cache_scope = 'posts'
+
+    @property
+    def throttle_scope(self):
+        # Only full-text searches are rate limited.
+        if self.request.query_params.get(api_settings.SEARCH_PARAM):
+            return 'search'
+        return None
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        fan_out_post(post)
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(IdempotencyKeyMixin, AnonymousResponseCacheMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    pagination_class = KeysetPagination
+    response_cache_scope = 'comments'
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user)
+            Post.objects.filter(pk=comment.post_id).update(comment_count=F('comment_count') + 1)
+            record_activity(comment.post_id, 'comment', when=comment.created_at)
 
-class FeedView(generics.ListAPIView):
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # A concurrent delete of the same comment removes nothing here.
+            deleted, _ = Comment.objects.filter(pk=instance.pk).delete()
+            if deleted:
+                Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+                retract_activity(instance.post_id, 'comment', instance.created_at)
+
+class FeedView(ConditionalGetMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    conditional_fields = PostViewSet.conditional_fields
+
+    @cached_property
+    def pulled_author_ids(self):
+        return pulled_author_ids(self.request.user)
+
+    def get_queryset(self):
+        # Each source only reads the page after the cursor, not the whole timeline.
+        position = self.paginator.get_position(self.request, Post.objects.all())
+        limit = self.paginator.get_page_size(self.request) + 1
+        return home_timeline(self.request.user, position, limit, self.pulled_author_ids)
+
+class TrendingPostsView(EagerLoadingMixin, generics.ListAPIView):
+    """
+    Posts ranked by time-decayed likes and comments, read in score order from
+    the TrendingScore index.
+    """
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = TrendingKeysetPagination
 
     def get_queryset(self):
-        user = self.request.user
-        following_users = user.following.all()
-        return Post.objects.filter(author__in=following_users).order_by('-created_at')
+        return Post.objects.filter(trending__isnull=False).annotate(trending_score=F('trending__score'))
 
-class LikePostView(generics.GenericAPIView):
+class LikePostView(IdempotencyKeyMixin, generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'like'
 
     def post(self, request, pk):
+        if settings.LIKE_BUFFER_ENABLED:
+            return self.buffered_like(request, pk)
         post = generics.get_object_or_404(Post, pk=pk)
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        if not created:
+        try:
+            # The insert is the first statement, so a duplicate rolls back nothing else.
+            with transaction.atomic():
+                like = Like.objects.create(user=request.user, post=post)
+                Post.objects.filter(pk=post.pk).update(like_count=F('like_count') + 1)
+                record_activity(post.pk, 'like', when=like.created_at)
+        except IntegrityError:
             return Response({'detail': 'You have already liked this post.'}, status=status.HTTP_400_BAD_REQUEST)
-        # Create notification for post author
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb='liked your post',
-                target=post
-            )
+        # Notify the post author
+        notify(post.author_id, request.user, 'liked your post', post)
         return Response({'detail': 'Post liked.'}, status=status.HTTP_201_CREATED)
 
+    def buffered_like(self, request, pk):
+        # Write-behind: the like is persisted by the next buffer flush.
+        liked = Exists(Like.objects.filter(user=request.user, post=OuterRef('pk')))
+        already_liked = Post.objects.filter(pk=pk).values_list(liked, flat=True).first()
+        if already_liked is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        if already_liked or not like_buffer.add(request.user.pk, pk):
+            return Response({'detail': 'You have already liked this post.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'detail': 'Post liked.'}, status=status.HTTP_202_ACCEPTED)
+
 class UnlikePostView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'like'
 
     def post(self, request, pk):
+        if settings.LIKE_BUFFER_ENABLED and like_buffer.discard(request.user.pk, pk):
+            return Response({'detail': 'Post unliked.'}, status=status.HTTP_200_OK)
         post = generics.get_object_or_404(Post, pk=pk)
         like = Like.objects.filter(user=request.user, post=post).first()
         if not like:
             return Response({'detail': 'You have not liked this post.'}, status=status.HTTP_400_BAD_REQUEST)
-        like.delete()
-        return Response({'detail': 'Post unliked.'}, status=status.HTTP_200_OK)
\ No newline at end of file
+        with transaction.atomic():
+            # A racing unlike may have deleted the row since it was read.
+            deleted, _ = Like.objects.filter(pk=like.pk).delete()
+            if deleted:
+                Post.objects.filter(pk=post.pk, like_count__gt=0).update(like_count=F('like_count') - 1)
+                retract_activity(post.pk, 'like', like.created_at)
+        return Response({'detail': 'Post unliked.'}, status=status.HTTP_200_OK)
+
+class ResponseCacheStatsView(APIView):
+    """
+    Hit/miss counts of the anonymous response cache, as seen by the serving
+    process. With a per-process cache such as LocMemCache, each worker keeps
+    its own counts.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        scopes = (PostViewSet.response_cache_scope, CommentViewSet.response_cache_scope)
+        return Response({scope: stats(scope) for scope in scopes})
@@ -0,0 +1,100 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Headers of the outer request that must not leak into sub-requests.
+EXCLUDED_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IDEMPOTENCY_KEY')
+
+batch_pool = ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET'], default='GET')
+    path = serializers.CharField()
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith('/api/') or path.startswith('/api/batch/'):
+            raise serializers.ValidationError('Only /api/ paths other than /api/batch/ can be batched.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+    concurrent = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f'Ensure this list has at most {settings.BATCH_MAX_REQUESTS} requests.')
+        return value
+
+
+class BatchView(APIView):
+    """
+    Runs several GET requests against the API in one round trip.
+
+    Each sub-request is resolved and dispatched to its view directly, skipping
+    the middleware stack, and is authenticated as the batch request's user
+    by BatchSubRequestAuthentication (see accounts.authentication) without
+    checking the credentials again. With `concurrent`, sub-requests run on
+    BATCH_MAX_WORKERS threads, each with its own database connection.
+    Results come back in request order as {status, body}.
+    """
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sub_requests = serializer.validated_data['requests']
+        if serializer.validated_data['concurrent'] and len(sub_requests) > 1:
+            results = list(batch_pool.map(lambda sub: self.run_in_thread(request, sub['path']), sub_requests))
+        else:
+            results = [self.run(request, sub['path']) for sub in sub_requests]
+        return Response({'responses': results})
+
+    def run_in_thread(self, request, path):
+        try:
+            return self.run(request, path)
+        finally:
+            close_old_connections()
+
+    def run(self, request, path):
+        url = urlsplit(path)
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {'status': 404, 'body': {'detail': 'Not found.'}}
+        if asyncio.iscoroutinefunction(match.func):
+            return {'status': 400, 'body': {'detail': 'Async endpoints cannot be batched.'}}
+        try:
+            response = match.func(self.sub_request(request, url), *match.args, **match.kwargs)
+        except Http404:
+            return {'status': 404, 'body': {'detail': 'Not found.'}}
+        if isinstance(response, Response):
+            return {'status': response.status_code, 'body': response.data}
+        content_type = response.get('Content-Type', '')
+        content = response.content.decode(response.charset) if response.content else None
+        if content and content_type.startswith('application/json'):
+            content = json.loads(content)
+        return {'status': response.status_code, 'body': content}
+
+    def sub_request(self, request, url):
+        sub = HttpRequest()
+        sub.method = 'GET'
+        sub.path = sub.path_info = url.path
+        sub.META = {key: value for key, value in request.META.items() if key not in EXCLUDED_META}
+        sub.META.update(REQUEST_METHOD='GET', PATH_INFO=url.path, QUERY_STRING=url.query)
+        sub.GET = QueryDict(url.query)
+        sub.COOKIES = request.COOKIES
+        if request.user.is_authenticated:
+            sub.batch_credentials = (request.user, request.auth)
+        sub.user = request.user
+        return sub
@@ -0,0 +1,71 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    ETag validators for list and retrieve.
+
+    Conditional list requests first read only `conditional_fields` of the rows
+    on the requested page and answer If-None-Match with a 304 before loading
+    full rows or running the serializer. Unconditional requests take the ETag
+    from the page they already loaded.
+
+    Fields that change without touching updated_at, such as counters, belong
+    in `conditional_fields`. There is no Last-Modified: counter updates and
+    deletes leave no newer timestamp behind, so If-Modified-Since would 304
+    on stale pages.
+    """
+    conditional_fields = ('id', 'updated_at')
+
+    def list(self, request, *args, **kwargs):
+        if 'HTTP_IF_NONE_MATCH' in request.META:
+            versions = self.filter_queryset(self.get_queryset()).values(*self.conditional_fields)
+            page = self.paginate_queryset(versions)
+            self.set_validators(request, list(versions) if page is None else page)
+            response = get_conditional_response(request, etag=self.etag)
+            if response is not None:
+                return self.with_validators(response)
+        self.page_rows = None
+        response = super().list(request, *args, **kwargs)
+        if self.page_rows is None:
+            versions = self.filter_queryset(self.get_queryset()).values(*self.conditional_fields)
+            self.page_rows = list(versions)
+        self.set_validators(request, self.page_rows)
+        return self.with_validators(response)
+
+    def paginate_queryset(self, queryset):
+        self.page_rows = super().paginate_queryset(queryset)
+        return self.page_rows
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        self.set_validators(request, [instance])
+        response = get_conditional_response(request, etag=self.etag)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return self.with_validators(response)
+
+    def set_validators(self, request, rows):
+        # Rows are model instances or values() dicts of the same fields.
+        values = [
+            [row[field] if isinstance(row, dict) else getattr(row, field) for field in self.conditional_fields]
+            for row in rows
+        ]
+        # The next link changes when rows are added past the end of the page,
+        # and the representation with ?fields=, ?exclude= or ?truncate=.
+        state = (
+            request.accepted_renderer.format,
+            getattr(self.paginator, 'has_next', None),
+            sorted(request.query_params.lists()),
+        )
+        digest = hashlib.md5(repr((state, values)).encode(), usedforsecurity=False)
+        self.etag = quote_etag(digest.hexdigest())
+
+    def with_validators(self, response):
+        if response.status_code in (200, 304):
+            response['ETag'] = self.etag
+        return response
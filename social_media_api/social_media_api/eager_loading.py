@@ -0,0 +1,85 @@
+from django.core.exceptions import FieldDoesNotExist
+
+
+def eager_load(queryset, serializer_class, attrs=None):
+    """
+    Apply the relations a serializer declares in Meta.select_related and
+    Meta.prefetch_related, so list pages don't issue a query per row.
+
+    When `attrs` is given, only relations starting with one of those model
+    attributes are loaded.
+    """
+    meta = getattr(serializer_class, 'Meta', None)
+    select_related = getattr(meta, 'select_related', ())
+    prefetch_related = getattr(meta, 'prefetch_related', ())
+    if attrs is not None:
+        select_related = [name for name in select_related if name.split('__')[0] in attrs]
+        prefetch_related = [name for name in prefetch_related if name.split('__')[0] in attrs]
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+
+def read_attrs(serializer):
+    """
+    The model attributes a serializer's fields read, or None when a field's
+    source can't be told. Fields whose source isn't a model field, like
+    properties or method fields, declare theirs in Meta.field_sources.
+    """
+    model = serializer.Meta.model
+    declared = getattr(serializer.Meta, 'field_sources', {})
+    attrs = {model._meta.pk.name}
+    for name, field in serializer.fields.items():
+        if name in declared:
+            attrs.update(declared[name])
+            continue
+        if field.source == '*':
+            return None
+        try:
+            model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            return None
+        attrs.add(field.source_attrs[0])
+    return attrs
+
+
+def load_only(queryset, attrs):
+    """Restrict the queryset's columns to those backing the given model attributes."""
+    columns = []
+    for attr in attrs:
+        try:
+            field = queryset.model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            # Annotations, such as a ranking, are selected regardless.
+            continue
+        if hasattr(field, 'ct_field'):
+            # A generic foreign key is backed by its content type and id columns.
+            columns += [field.ct_field, field.fk_field]
+        elif field.concrete:
+            columns.append(attr)
+    return queryset.only(*columns)
+
+
+class EagerLoadingMixin:
+    """
+    Generic view mixin that eager loads the serializer's declared relations.
+
+    For a sparse fieldset request (see SparseFieldsetMixin), only the columns
+    and relations of the requested fields are loaded, along with those the
+    view needs itself: the pagination ordering and `conditional_fields`.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        attrs = read_attrs(serializer) if getattr(serializer, 'is_sparse', False) else None
+        queryset = eager_load(queryset, type(serializer), attrs)
+        if attrs is not None:
+            queryset = load_only(queryset, attrs | self.required_attrs())
+        return queryset
+
+    def required_attrs(self):
+        ordering = getattr(self.paginator, 'ordering', ())
+        return {name.lstrip('-') for name in ordering} | set(getattr(self, 'conditional_fields', ()))
@@ -0,0 +1,103 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+def idempotency_cache():
+    return caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still being processed.'
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used with a different request body.'
+    default_code = 'idempotency_key_reused'
+
+
+class Replay(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class IdempotencyKeyMixin:
+    """
+    Replays the stored response for a retried POST that carries the same
+    `Idempotency-Key` header, without running the handler again.
+
+    Keys are scoped to the authenticated user and the request path. The first
+    request reserves the key with an atomic cache add(); its status code and
+    response data are stored for IDEMPOTENCY_KEY_TTL seconds. Server errors
+    release the key so the client can retry for real. Requests without the
+    header, or from anonymous users, are handled as usual.
+    """
+    idempotency_header = 'HTTP_IDEMPOTENCY_KEY'
+    idempotency_max_key_length = 255
+
+    def initial(self, request, *args, **kwargs):
+        self.idempotency_cache_key = None
+        super().initial(request, *args, **kwargs)
+        key = request.META.get(self.idempotency_header)
+        if request.method != 'POST' or not key or not request.user.is_authenticated:
+            return
+        if len(key) > self.idempotency_max_key_length:
+            raise ValidationError({'Idempotency-Key': f'Ensure this header has at most {self.idempotency_max_key_length} characters.'})
+
+        cache = idempotency_cache()
+        cache_key = 'idempotency:' + hashlib.sha256(f'{request.user.pk}:{request.path}:{key}'.encode()).hexdigest()
+        # The body has not been parsed yet, so it can still be read raw.
+        fingerprint = hashlib.sha256(request._request.body).hexdigest()
+        if cache.add(cache_key, (PENDING, fingerprint), settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            self.idempotency_cache_key, self.idempotency_fingerprint = cache_key, fingerprint
+            return
+        stored = cache.get(cache_key)
+        if stored is None:
+            # Expired between add() and get(); this request is a fresh attempt.
+            cache.set(cache_key, (PENDING, fingerprint), settings.IDEMPOTENCY_LOCK_TIMEOUT)
+            self.idempotency_cache_key, self.idempotency_fingerprint = cache_key, fingerprint
+            return
+        if stored[1] != fingerprint:
+            raise IdempotencyKeyReused()
+        if stored[0] == PENDING:
+            raise IdempotencyConflict()
+        _, _, status_code, data, headers = stored
+        raise Replay(Response(data, status=status_code, headers={**headers, 'Idempotent-Replayed': 'true'}))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Replay):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # Unhandled errors never reach finalize_response; free the key.
+            if getattr(self, 'idempotency_cache_key', None) is not None:
+                idempotency_cache().delete(self.idempotency_cache_key)
+                self.idempotency_cache_key = None
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        cache_key = getattr(self, 'idempotency_cache_key', None)
+        if cache_key is not None:
+            self.idempotency_cache_key = None
+            cache = idempotency_cache()
+            if response.status_code >= 500 or not isinstance(response, Response):
+                cache.delete(cache_key)
+            else:
+                headers = {name: response[name] for name in ('Location',) if name in response}
+                cache.set(
+                    cache_key,
+                    (DONE, self.idempotency_fingerprint, response.status_code, response.data, headers),
+                    settings.IDEMPOTENCY_KEY_TTL,
+                )
+        return super().finalize_response(request, response, *args, **kwargs)
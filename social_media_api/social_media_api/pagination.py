@@ -0,0 +1,135 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a unique, indexed column tuple.
+
+    Each page is a `WHERE (ordering) < (cursor) ... LIMIT n` range read, so
+    deep pages cost the same as the first one and no COUNT(*) is issued.
+    Cursors are opaque, base64 encoded column values of the last row served.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.get_position(request, queryset)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_ordering(self, queryset):
+        return self.ordering
+
+    def get_position(self, request, queryset):
+        """The ordering values of the last row served, or None on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        return self.decode_cursor(encoded, queryset) if encoded else None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def position_filter(self, values):
+        # (a, b) < (x, y)  ==>  a < x OR (a = x AND b < y)
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{field.lstrip("-")}__{lookup}': values[index]})
+            for previous, value in zip(self.ordering[:index], values):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, row):
+        values = []
+        for field in self.ordering:
+            value = row[field.lstrip('-')] if isinstance(row, dict) else getattr(row, field.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, encoded, queryset):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.cursor_field(queryset, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def cursor_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class TimestampKeysetPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class TrendingKeysetPagination(KeysetPagination):
+    # Scores move as activity arrives, so a post can shift between pages.
+    ordering = ('-trending_score', '-id')
+
+
+class SearchRankKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination that orders by relevance when a search backend has
+    annotated the queryset with `search_rank`, and by recency otherwise.
+    """
+    rank_ordering = ('-search_rank', '-id')
+
+    def get_ordering(self, queryset):
+        if 'search_rank' in queryset.query.annotations:
+            return self.rank_ordering
+        return super().get_ordering(queryset)
@@ -0,0 +1,104 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import urlencode
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def version_key(scope):
+    return f'response-cache:{scope}:version'
+
+
+def stats_key(scope, outcome):
+    return f'response-cache:{scope}:{outcome}'
+
+
+def current_version(scope):
+    cache = response_cache()
+    version = cache.get(version_key(scope))
+    if version is None:
+        # A fresh, ever-increasing start so an evicted counter never reuses an
+        # old version whose responses may still be cached.
+        version = time.time_ns()
+        if not cache.add(version_key(scope), version, None):
+            version = cache.get(version_key(scope), version)
+    return version
+
+
+def invalidate(*scopes):
+    """Orphan every cached response of the given scopes by bumping their version."""
+    cache = response_cache()
+    for scope in scopes:
+        try:
+            cache.incr(version_key(scope))
+        except ValueError:
+            # No version yet; the next read starts a new one.
+            pass
+
+
+def record(scope, outcome):
+    cache = response_cache()
+    try:
+        cache.incr(stats_key(scope, outcome))
+    except ValueError:
+        cache.add(stats_key(scope, outcome), 1, None)
+
+
+def stats(scope):
+    cache = response_cache()
+    return {outcome: cache.get(stats_key(scope, outcome), 0) for outcome in ('hits', 'misses')}
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Caches rendered list responses for anonymous requests.
+
+    Keys combine `response_cache_scope`, its current version, the path, the
+    sorted query parameters and the rendered format. Model signals bump the
+    scope version (see posts.signals), which orphans every page of the scope at
+    once; orphaned entries expire after RESPONSE_CACHE_TTL.
+    """
+    response_cache_scope = None
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        cache = response_cache()
+        key = self.response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            record(self.response_cache_scope, 'hits')
+            return self.cached_response(request, *cached)
+        record(self.response_cache_scope, 'misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key,
+                    (rendered.content, rendered.status_code, list(rendered.items())),
+                    settings.RESPONSE_CACHE_TTL,
+                )
+            )
+        return response
+
+    def response_cache_key(self, request):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        path = f'{request.path}?{query}:{request.accepted_renderer.format}'
+        digest = hashlib.md5(path.encode(), usedforsecurity=False).hexdigest()
+        scope = self.response_cache_scope
+        return f'response-cache:{scope}:{current_version(scope)}:{digest}'
+
+    def cached_response(self, request, content, status, headers):
+        headers = dict(headers)
+        not_modified = get_conditional_response(request, etag=headers.get('ETag'))
+        if not_modified is not None:
+            not_modified['ETag'] = headers['ETag']
+            return not_modified
+        return HttpResponse(content, status=status, headers=headers)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -91,6 +92,12 @@ DATABASES = {
 }
 
 
+AUTH_USER_MODEL = 'accounts.CustomUser'
+
+# ModelBackend that hashes async logins on the hasher pool, see accounts.backends.
+AUTHENTICATION_BACKENDS = ['accounts.backends.HasherPoolModelBackend']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -110,6 +117,22 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Passwords are hashed with PBKDF2 at PASSWORD_HASH_ITERATIONS rounds, set per
+# environment. Hashes at another cost are re-encoded on the user's next login.
+# Async logins hash on a pool of PASSWORD_HASHER_THREADS threads. The stock
+# PBKDF2PasswordHasher is left out: it shares the pbkdf2_sha256 name and would
+# take over verifying those hashes.
+PASSWORD_HASHERS = [
+    'accounts.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 1_000_000))
+PASSWORD_HASHER_THREADS = int(os.environ.get('PASSWORD_HASHER_THREADS', os.cpu_count() or 1))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -138,12 +161,32 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.BatchSubRequestAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Sliding-window limits per user (or client address when anonymous) for
+    # views that set a matching throttle_scope.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'social_media_api.throttling.ScopedSlidingWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'like': '120/min',
+        'follow': '60/min',
+        'register': '10/hour',
+        'login': '20/min',
+        'search': '60/min',
+    },
 }
 
+# Cache holding the throttle counters; use a shared backend with several workers.
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Cached token lookups, see accounts.authentication.
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_MAX_SIZE = 10000
+
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 X_FRAME_OPTIONS = 'DENY'
@@ -153,9 +196,108 @@ SECURE_SSL_REDIRECT = True
 CSRF_COOKIE_SECURE = True
 SESSION_COOKIE_SECURE = True
 
-DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+STORAGES = {
+    'default': {'BACKEND': 'accounts.storage.MediaStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
 AWS_ACCESS_KEY_ID = 'your-access-key'
 AWS_SECRET_ACCESS_KEY = 'your-secret-key'
 AWS_STORAGE_BUCKET_NAME = 'your-bucket-name'
 AWS_S3_REGION_NAME = 'your-region'  # e.g., 'us-east-1'
-AWS_QUERYSTRING_AUTH = False
\ No newline at end of file
+AWS_QUERYSTRING_AUTH = False
+
+# Uploaded profile pictures are spooled to PROFILE_PICTURE_SPOOL_DIR during
+# registration and processed by PROFILE_PICTURE_WORKERS background threads:
+# the original is scaled to fit PROFILE_PICTURE_MAX_SIZE and square renditions
+# are cut at PROFILE_PICTURE_RENDITIONS sizes in each PROFILE_PICTURE_FORMATS.
+# Stored names carry a content hash, and accounts.storage.MediaStorage uploads
+# them with an immutable, year-long Cache-Control.
+PROFILE_PICTURE_SPOOL_DIR = BASE_DIR / 'spool' / 'profile_pics'
+PROFILE_PICTURE_WORKERS = 2
+PROFILE_PICTURE_PROCESS_SYNC = False
+PROFILE_PICTURE_MAX_SIZE = 1024
+PROFILE_PICTURE_QUALITY = 85
+PROFILE_PICTURE_RENDITIONS = {
+    'small': 64,
+    'medium': 256,
+}
+PROFILE_PICTURE_FORMATS = ('webp', 'jpeg')
+
+# Home timeline: posts are pushed into follower timelines on write unless the
+# author has more than TIMELINE_FANOUT_LIMIT followers, in which case feeds pull
+# them on read. TIMELINE_BACKFILL_SIZE recent posts are copied on a new follow.
+# Run `manage.py backfill_timelines` once to fan out posts older than timelines.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL_SIZE = 100
+
+# Upper bound on ids accepted by /api/accounts/follow/bulk/ and unfollow/bulk/.
+FOLLOW_BULK_MAX_IDS = 1000
+
+# Trending posts: likes and comments add TRENDING_WEIGHTS to a post's score,
+# which halves every TRENDING_HALF_LIFE seconds. Run `manage.py compact_trending`
+# periodically to drop posts below TRENDING_MIN_SCORE and cap the table at
+# TRENDING_MAX_ROWS. Changing the half-life requires `compact_trending --rebuild`.
+TRENDING_HALF_LIFE = 12 * 60 * 60
+TRENDING_WEIGHTS = {
+    'like': 1.0,
+    'comment': 3.0,
+}
+TRENDING_MIN_SCORE = 0.05
+TRENDING_MAX_ROWS = 10000
+
+# Write-behind likes: when enabled, LikePostView answers 202 and likes are
+# written in batches of up to LIKE_BUFFER_MAX_SIZE, or every
+# LIKE_BUFFER_FLUSH_INTERVAL seconds.
+LIKE_BUFFER_ENABLED = False
+LIKE_BUFFER_MAX_SIZE = 500
+LIKE_BUFFER_FLUSH_INTERVAL = 1.0
+
+# Notifications are queued in process and written in batches, coalesced by
+# (recipient, verb, target), every NOTIFICATIONS_DISPATCH_INTERVAL seconds or
+# once NOTIFICATIONS_DISPATCH_MAX_SIZE events are queued. Set
+# NOTIFICATIONS_DISPATCH_SYNC to write them inline (tests, management commands).
+NOTIFICATIONS_DISPATCH_SYNC = False
+NOTIFICATIONS_DISPATCH_INTERVAL = 1.0
+NOTIFICATIONS_DISPATCH_MAX_SIZE = 1000
+
+# Cached per-user unread counters expire after this many seconds and are
+# rebuilt from the partial unread index.
+NOTIFICATIONS_UNREAD_COUNT_TTL = 300
+
+# Bulk mark-as-read / delete endpoints touch at most this many rows per statement.
+NOTIFICATIONS_BULK_CHUNK_SIZE = 5000
+
+# /api/notifications/stream/ (server-sent events, served via asgi.py) re-checks
+# the database at least every NOTIFICATIONS_STREAM_TIMEOUT seconds and sends at
+# most NOTIFICATIONS_STREAM_BATCH_SIZE rows per read.
+NOTIFICATIONS_STREAM_TIMEOUT = 25
+NOTIFICATIONS_STREAM_BATCH_SIZE = 100
+
+# Per-process memory cache. Point this at a shared backend (Redis, Memcached)
+# when running several workers so cached counters agree across processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Anonymous post and comment list pages are cached in RESPONSE_CACHE_ALIAS for
+# up to RESPONSE_CACHE_TTL seconds. Writes invalidate them through versioned
+# keys; the TTL bounds staleness from changes that send no signals, such as
+# author renames. Hit/miss counts are at /api/posts/response-cache/stats/ (staff
+# only); `manage.py response_cache_stats` needs a cache shared across processes.
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TTL = 60
+
+# POSTs carrying an Idempotency-Key header store their response for
+# IDEMPOTENCY_KEY_TTL seconds and replay it for retries with the same key. A key
+# stays reserved for at most IDEMPOTENCY_LOCK_TIMEOUT seconds while its first
+# request runs.
+IDEMPOTENCY_CACHE_ALIAS = 'default'
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# /api/batch/ accepts up to BATCH_MAX_REQUESTS GET sub-requests and runs
+# concurrent batches on BATCH_MAX_WORKERS threads.
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
@@ -0,0 +1,68 @@
+from functools import cached_property
+
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+TRUNCATE_PARAM = 'truncate'
+
+
+def split_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for sparse fieldsets on GET requests.
+
+    `?fields=id,title` keeps only the listed fields and `?exclude=content`
+    drops fields; unknown names are a 400. `?truncate=<n>` cuts the fields in
+    Meta.truncate_fields to n characters. Views using EagerLoadingMixin also
+    leave the columns and relations of dropped fields out of the query.
+    """
+    truncation_suffix = '…'
+
+    @cached_property
+    def request_params(self):
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return {}
+        return request.query_params
+
+    @property
+    def is_sparse(self):
+        return bool(self.request_params.get(FIELDS_PARAM) or self.request_params.get(EXCLUDE_PARAM))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = split_names(self.request_params.get(FIELDS_PARAM, ''))
+        excluded = split_names(self.request_params.get(EXCLUDE_PARAM, ''))
+        errors = {}
+        for param, names in ((FIELDS_PARAM, requested), (EXCLUDE_PARAM, excluded)):
+            unknown = [name for name in names if name not in fields]
+            if unknown:
+                errors[param] = [f'Unknown field(s): {", ".join(unknown)}.']
+        if self.request_params.get(TRUNCATE_PARAM) and self.truncate_length is None:
+            errors[TRUNCATE_PARAM] = ['A positive integer is required.']
+        if errors:
+            raise ValidationError(errors)
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        for name in excluded:
+            fields.pop(name, None)
+        return fields
+
+    @cached_property
+    def truncate_length(self):
+        value = self.request_params.get(TRUNCATE_PARAM, '')
+        return int(value) if value.isdigit() and int(value) > 0 else None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        length = self.truncate_length
+        if length is not None:
+            for name in getattr(self.Meta, 'truncate_fields', ()):
+                value = data.get(name)
+                if isinstance(value, str) and len(value) > length:
+                    data[name] = value[:length].rstrip() + self.truncation_suffix
+        return data
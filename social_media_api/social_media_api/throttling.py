@@ -0,0 +1,95 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+parse_rate = SimpleRateThrottle.parse_rate
+
+
+def throttle_cache():
+    return caches[settings.THROTTLE_CACHE_ALIAS]
+
+
+class SlidingWindow:
+    """
+    Sliding-window request counter kept in the cache.
+
+    Only the counts of the current and previous fixed windows are stored; the
+    previous one is weighted by how much of it still overlaps the sliding
+    window. A check is one get_many() and an add() or incr(), whatever the
+    rate, unlike SimpleRateThrottle which stores every request timestamp.
+    """
+
+    def __init__(self, rate):
+        self.limit, self.window = parse_rate(None, rate)
+
+    def keys(self, ident, now):
+        index = int(now // self.window)
+        return f'throttle:{ident}:{index}', f'throttle:{ident}:{index - 1}'
+
+    def estimate(self, counts, current_key, previous_key, now):
+        elapsed = now % self.window
+        current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+        if previous * (1 - elapsed / self.window) + current < self.limit:
+            return 0
+        # Seconds until the weighted count drops below the limit again.
+        if current < self.limit:
+            return max(math.ceil(self.window * (1 - (self.limit - current) / previous) - elapsed), 1)
+        return max(math.ceil(self.window - elapsed + self.window * (1 - self.limit / current)), 1)
+
+    def hit(self, ident, now=None):
+        """Count a request. Returns 0 if allowed, else the seconds to wait."""
+        now = time.time() if now is None else now
+        cache = throttle_cache()
+        current_key, previous_key = self.keys(ident, now)
+        wait = self.estimate(cache.get_many([current_key, previous_key]), current_key, previous_key, now)
+        if not wait and not cache.add(current_key, 1, self.window * 2):
+            try:
+                cache.incr(current_key)
+            except ValueError:
+                pass
+        return wait
+
+    async def ahit(self, ident, now=None):
+        now = time.time() if now is None else now
+        cache = throttle_cache()
+        current_key, previous_key = self.keys(ident, now)
+        wait = self.estimate(await cache.aget_many([current_key, previous_key]), current_key, previous_key, now)
+        if not wait and not await cache.aadd(current_key, 1, self.window * 2):
+            try:
+                await cache.aincr(current_key)
+            except ValueError:
+                pass
+        return wait
+
+
+def scope_window(scope):
+    rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+    return SlidingWindow(rate) if rate else None
+
+
+class ScopedSlidingWindowThrottle(BaseThrottle):
+    """
+    Limits each user, or client address when anonymous, to the rate of the
+    view's `throttle_scope` in DEFAULT_THROTTLE_RATES. Views without a scope,
+    or with no rate for it, are not throttled.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        window = scope_window(scope) if scope else None
+        if window is None:
+            return True
+        self.wait_seconds = window.hit(f'{scope}:{self.get_cache_ident(request)}')
+        return not self.wait_seconds
+
+    def get_cache_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def wait(self):
+        return self.wait_seconds